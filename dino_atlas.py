@@ -0,0 +1,127 @@
+import hashlib
+import mmap
+import os
+import struct
+import sys
+
+import pygame
+
+from dino_log import LOG
+
+# 圖集檔格式：
+#   檔頭：魔術字串、版本、來源雜湊（SHA-256，來源 PNG、圖片尺寸和繪製程式碼的版本）、圖片數
+#   索引：每張圖片的名稱、寬、高、像素資料的偏移
+#   內容：每張圖片已經縮放好的 RGBA 像素
+# 讀取時用 mmap 映射整個檔案，Surface 直接使用映射的像素，不解碼 PNG 也不縮放；
+# 唯讀映射的分頁由作業系統共用，多個工作行程只佔一份記憶體
+MAGIC = b'DINA'
+VERSION = 1
+HEADER = struct.Struct('<4sB32sH')
+ENTRY = struct.Struct('<24sHHI')
+
+
+def source_hash(paths, recipe=b''):
+    # 圖集來源的雜湊：每個來源檔的內容（不存在的檔案也算，之後加入圖片會讓圖集過期）、
+    # recipe（dino_game.atlas_recipe：圖片尺寸和繪製程式碼的版本），
+    # 加上 pygame 的版本，不同版本的縮放結果可能不同
+    digest = hashlib.sha256(pygame.version.ver.encode())
+    digest.update(struct.pack('<Q', len(recipe)) + recipe)
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            data = None
+        digest.update(os.path.basename(path).encode() + b'\0')
+        if data is None:
+            digest.update(b'missing\0')
+        else:
+            digest.update(struct.pack('<Q', len(data)) + data)
+    return digest.digest()
+
+
+def write_atlas(path, sources, surfaces, recipe=b''):
+    # surfaces：{(圖片名稱, 尺寸): Surface}
+    index = []
+    pixels = []
+    offset = HEADER.size + ENTRY.size * len(surfaces)
+    for (name, (width, height)), surface in surfaces.items():
+        data = pygame.image.tobytes(surface, 'RGBA')
+        index.append(ENTRY.pack(name.encode(), width, height, offset))
+        pixels.append(data)
+        offset += len(data)
+    # 先寫到暫存檔再換上，遊戲不會讀到寫了一半的圖集
+    temp = path + '.tmp'
+    with open(temp, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, source_hash(sources, recipe), len(surfaces)))
+        f.write(b''.join(index))
+        f.write(b''.join(pixels))
+    os.replace(temp, path)
+
+
+def load_atlas(path, sources, recipe=b''):
+    # 回傳 {(圖片名稱, 尺寸): Surface}；沒有圖集、格式不對或來源已經改變時回傳 None，改用 PNG
+    try:
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):  # 檔案不存在或是空的
+        return None
+    if len(mapped) < HEADER.size:
+        LOG.warning("Sprite atlas %s is truncated, loading PNGs", path)
+        return None
+    magic, version, digest, count = HEADER.unpack_from(mapped)
+    if magic != MAGIC or version != VERSION:
+        LOG.warning("%s is not a sprite atlas (version %d), loading PNGs", path, VERSION)
+        return None
+    if digest != source_hash(sources, recipe):
+        LOG.warning("Sprite atlas %s is stale, loading PNGs (rebuild with python dino_atlas.py)", path)
+        return None
+
+    view = memoryview(mapped)
+    surfaces = {}
+    for i in range(count):
+        name, width, height, offset = ENTRY.unpack_from(mapped, HEADER.size + i * ENTRY.size)
+        end = offset + width * height * 4
+        if end > len(mapped):
+            LOG.warning("Sprite atlas %s is truncated, loading PNGs", path)
+            return None
+        # Surface 和映射的記憶體共用像素，保留 Surface 就會保留映射
+        surfaces[(name.rstrip(b'\0').decode(), (width, height))] = pygame.image.frombuffer(
+            view[offset:end], (width, height), 'RGBA')
+    return surfaces
+
+
+def main():
+    # 遊戲啟動時會 import 這個模組，只有建立圖集時才需要 argparse
+    import argparse
+    parser = argparse.ArgumentParser(description='Bake the Dino Run sprite atlas')
+    parser.add_argument('--check', action='store_true',
+                        help='只檢查圖集是否和來源一致，過期或不存在時回傳 1')
+    args = parser.parse_args()
+
+    # 在這裡才 import：dino_game 讀取圖集時會 import 這個模組
+    import dino_game
+    sources = dino_game.atlas_sources()
+    recipe = dino_game.atlas_recipe()
+    path = dino_game.ATLAS_PATH
+    if args.check:
+        fresh = load_atlas(path, sources, recipe) is not None
+        print(f"{path} is {'up to date' if fresh else 'missing or stale'}")
+        LOG.close()
+        sys.exit(0 if fresh else 1)
+
+    # 用和遊戲相同的方式讀取、縮放或繪製每張圖片（不使用舊的圖集）
+    cache = dino_game.AssetCache(use_atlas=False)
+    surfaces = {}
+    for name, size, create, drawn in dino_game.game_sprites():
+        if drawn:
+            surfaces[(name, size)] = cache.get_drawn(name, size, create)
+        else:
+            surfaces[(name, size)] = cache.get(name, size, create)
+    write_atlas(path, sources, surfaces, recipe)
+    LOG.close()
+    print(f"Wrote {len(surfaces)} sprites to {path} ({os.path.getsize(path)} bytes)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+import argparse
+import time
+
+import numpy as np
+
+import dino_game
+
+# 地形依序循環，障礙物的寬度由地形決定
+TERRAINS = ('plains', 'mountain', 'forest')
+
+# 規則的常數直接從遊戲的物件取得，確保和 Dino.update / GameState.step 一致
+_DINO = dino_game.Dino()
+_OBSTACLES = [dino_game.Obstacle(terrain) for terrain in TERRAINS]
+OBSTACLE_WIDTHS = np.array([obstacle.width for obstacle in _OBSTACLES], dtype=np.float64)
+OBSTACLE_Y = _OBSTACLES[0].y
+OBSTACLE_HEIGHT = _OBSTACLES[0].height
+SPAWN_X = _OBSTACLES[0].x
+
+# splitmix64 的常數（和 dino_game.SplitMix64 相同）：每個環境一條亂數串流，可以一次對所有環境取亂數
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+
+
+def splitmix64(state):
+    # 回傳 (新的狀態, 0 到 1 之間的亂數)，state 為 uint64 陣列
+    state = state + _GOLDEN
+    z = state
+    z = (z ^ (z >> np.uint64(30))) * _MIX1
+    z = (z ^ (z >> np.uint64(27))) * _MIX2
+    z = z ^ (z >> np.uint64(31))
+    return state, (z >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+
+
+class BatchEnv:
+    # 同時執行 num_envs 局互相獨立的遊戲，所有狀態都放在 NumPy 陣列中
+    # 規則和亂數都和 GameState.step 相同（AI 關閉、只用外框判斷碰撞）：
+    # 第 i 個環境的第一局和 GameState(seed + i) 完全一樣，之後的局繼續使用同一條亂數串流
+    def __init__(self, num_envs, seed=0, base_gap=400, spawn_chance=dino_game.OBSTACLE_SPAWN_CHANCE,
+                 auto_reset=True):
+        self.num_envs = num_envs
+        self.base_gap = base_gap
+        self.spawn_chance = spawn_chance
+        self.auto_reset = auto_reset
+
+        # 障礙物之間至少相隔 base_gap，畫面上最多只會有這麼多個
+        self.capacity = int((dino_game.WINDOW_WIDTH + OBSTACLE_WIDTHS.max()) // base_gap) + 2
+
+        # 每個環境的亂數串流，起始狀態和 SplitMix64(seed + i) 相同
+        with np.errstate(over='ignore'):
+            self.rng_state = np.uint64(seed & dino_game.MASK64) + np.arange(num_envs, dtype=np.uint64)
+
+        n = num_envs
+        self.y = np.empty(n)
+        self.jump_speed = np.empty(n)
+        self.is_jumping = np.empty(n, dtype=bool)
+        self.distance = np.empty(n)
+        self.speed = np.empty(n)
+        self.terrain = np.empty(n, dtype=np.int8)
+        self.next_change = np.empty(n)
+        self.consecutive_count = np.empty(n, dtype=np.int32)
+        self.last_obstacle_x = np.empty(n)
+        self.ticks = np.empty(n, dtype=np.int64)
+        self.done = np.empty(n, dtype=bool)
+        # 障礙物依 x 排序靠左存放，沒有使用的位置 x 為 inf
+        self.obstacle_x = np.empty((n, self.capacity))
+        self.obstacle_width = np.empty((n, self.capacity))
+        self.obstacle_count = np.empty(n, dtype=np.int32)
+        self.episodes = np.zeros(n, dtype=np.int64)  # 每個環境已經結束的局數
+        self.rows = np.arange(n)
+        self.reset()
+
+    def reset(self, mask=None):
+        # 重新開始指定的環境（預設全部），亂數串流繼續使用
+        rows = self.rows if mask is None else np.nonzero(mask)[0]
+        self.y[rows] = _DINO.ground_y
+        self.jump_speed[rows] = 0
+        self.is_jumping[rows] = False
+        self.distance[rows] = 0
+        self.speed[rows] = _DINO.speed
+        self.terrain[rows] = 0
+        self.next_change[rows] = 100
+        self.consecutive_count[rows] = 0
+        self.last_obstacle_x[rows] = 0
+        self.ticks[rows] = 0
+        self.done[rows] = False
+        self.obstacle_x[rows] = np.inf
+        self.obstacle_width[rows] = 0
+        self.obstacle_count[rows] = 0
+
+    def random(self, mask):
+        # 只有 mask 為 True 的環境會前進自己的亂數串流（和 GameState 只在可以生成時取亂數一樣）
+        with np.errstate(over='ignore'):
+            state, value = splitmix64(self.rng_state)
+        self.rng_state = np.where(mask, state, self.rng_state)
+        return value
+
+    def step(self, actions):
+        # actions：每個環境是否跳躍；回傳 (這個 tick 結束的環境, 結束時的距離)
+        # 已經結束但沒有自動重新開始的環境不會再改變
+        live = ~self.done
+        dino = _DINO
+
+        # 跳躍（Dino.jump）
+        start = live & np.asarray(actions, dtype=bool) & ~self.is_jumping
+        self.jump_speed[start] = dino.jump_velocity
+        self.is_jumping |= start
+
+        # 重力和落地（Dino.update）
+        air = live & self.is_jumping
+        self.y = np.where(air, self.y + self.jump_speed, self.y)
+        self.jump_speed = np.where(air, self.jump_speed + dino.gravity, self.jump_speed)
+        landed = air & (self.y >= dino.ground_y)
+        self.y[landed] = dino.ground_y
+        self.is_jumping[landed] = False
+        self.jump_speed[landed] = 0
+
+        # 距離和速度
+        self.distance = np.where(live, self.distance + self.speed * dino.distance_multiplier,
+                                 self.distance)
+        speed = np.minimum(5 + (self.distance // 100) * dino.acceleration, dino.max_speed)
+        self.speed = np.where(live, speed, self.speed)
+
+        # 生成障礙物（ObstacleManager.should_spawn）
+        count = self.obstacle_count
+        empty = count == 0
+        min_gap = self.base_gap + (self.speed - 5) * 15
+        last_x = self.obstacle_x[self.rows, np.maximum(count - 1, 0)]
+        room = live & ~empty & ~(last_x >= dino_game.WINDOW_WIDTH - min_gap)
+        gap = last_x - self.last_obstacle_x
+        consecutive = np.where(gap < min_gap * 0.7, self.consecutive_count + 1, 0)
+        self.consecutive_count = np.where(room, consecutive, self.consecutive_count)
+        self.consecutive_count[live & empty] = 0
+        allowed = room & (self.consecutive_count < 2)
+        self.last_obstacle_x = np.where(allowed, last_x, self.last_obstacle_x)
+        allowed |= live & empty
+        spawn = allowed & (self.random(allowed) < self.spawn_chance)
+        rows = np.nonzero(spawn)[0]
+        if len(rows):
+            slots = count[rows]
+            if slots.max() >= self.capacity:
+                raise RuntimeError(f"BatchEnv obstacle capacity {self.capacity} exceeded")
+            self.obstacle_x[rows, slots] = SPAWN_X
+            self.obstacle_width[rows, slots] = OBSTACLE_WIDTHS[self.terrain[rows]]
+            self.obstacle_count[rows] += 1
+
+        # 移動障礙物（Obstacle.update）
+        self.obstacle_x -= np.where(live, self.speed, 0)[:, None]
+
+        # 外框碰撞（GameState.collides，pixel_collisions 為 False 時）
+        x = self.obstacle_x
+        hit = ((dino.x < x + self.obstacle_width) & (dino.x + dino.width > x)).any(axis=1)
+        hit &= (self.y < OBSTACLE_Y + OBSTACLE_HEIGHT) & (self.y + dino.height > OBSTACLE_Y)
+        finished = live & hit
+        self.done |= finished
+
+        # 移除超出畫面的障礙物（ObstaclePool.expire）
+        expired = self.obstacle_x[:, 0] < -self.obstacle_width[:, 0]
+        while expired.any():
+            rows = np.nonzero(expired)[0]
+            self.obstacle_x[rows, :-1] = self.obstacle_x[rows, 1:]
+            self.obstacle_x[rows, -1] = np.inf
+            self.obstacle_width[rows, :-1] = self.obstacle_width[rows, 1:]
+            self.obstacle_width[rows, -1] = 0
+            self.obstacle_count[rows] -= 1
+            expired = self.obstacle_x[:, 0] < -self.obstacle_width[:, 0]
+
+        # 改變地形（Background.update）
+        change = live & (self.distance >= self.next_change)
+        self.terrain = np.where(change, (self.terrain + 1) % len(TERRAINS), self.terrain).astype(np.int8)
+        self.next_change = np.where(change, self.next_change + 100, self.next_change)
+
+        self.ticks += live
+        distances = np.where(finished, self.distance, 0)
+        if self.auto_reset and finished.any():
+            self.episodes += finished
+            self.reset(finished)
+        return finished, distances
+
+    def observe(self):
+        # 每個環境一列：恐龍高度、垂直速度、速度、前方最近障礙物的距離和寬度、下一個障礙物的距離
+        ahead = self.obstacle_x + self.obstacle_width > _DINO.x
+        first = ahead.argmax(axis=1)
+        has_first = ahead[self.rows, first]
+        second = np.minimum(first + 1, self.capacity - 1)
+        front = _DINO.x + _DINO.width
+        nearest = np.where(has_first, self.obstacle_x[self.rows, first] - front, np.inf)
+        width = np.where(has_first, self.obstacle_width[self.rows, first], 0)
+        following = np.where(has_first & (first + 1 < self.capacity),
+                             self.obstacle_x[self.rows, second] - front, np.inf)
+        return np.stack([self.y, self.jump_speed, self.speed, nearest, width, following], axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Dino Run batch environment throughput')
+    parser.add_argument('--envs', type=int, default=4096, help='同時執行的遊戲數')
+    parser.add_argument('--steps', type=int, default=2000, help='每個遊戲前進幾個 tick')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--jump-chance', type=float, default=0.02, help='隨機策略每個 tick 跳躍的機率')
+    args = parser.parse_args()
+
+    env = BatchEnv(args.envs, seed=args.seed)
+    policy = np.random.default_rng(args.seed)
+    finished = []
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        done, distances = env.step(policy.random(args.envs) < args.jump_chance)
+        finished.append(distances[done])
+    elapsed = time.perf_counter() - start
+    distances = np.concatenate(finished)
+    print(f"{args.envs * args.steps / elapsed:,.0f} env-steps/s "
+          f"({args.envs} envs x {args.steps} steps in {elapsed:.2f}s)")
+    if len(distances):
+        print(f"{len(distances)} games finished, mean distance {distances.mean():.1f}m, "
+              f"max {distances.max():.1f}m")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,253 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+# 基準測試不需要真正的視窗和音效
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+
+import dino_game
+
+BENCH_SEED = 12345
+
+
+# 各種情境的設定：在 GameState 建立後調整狀態
+def setup_terrain(terrain_type):
+    def setup(state):
+        background = state.background
+        background.terrain_type = terrain_type
+        background.next_change = float('inf')  # 固定在這個地形
+        background.generate_terrain()
+    return setup
+
+
+def setup_max_speed(state):
+    # 距離 3500m 時速度達到上限 12
+    state.dino.distance = 3500
+    state.dino.speed = state.dino.max_speed
+    state.background.next_change = 3600
+
+
+def setup_dense(state):
+    # 縮小障礙物間距並提高生成機率
+    state.obstacle_manager.base_gap = 150
+    state.spawn_chance = 0.5
+
+
+SCENARIOS = {
+    'plains': setup_terrain('plains'),
+    'mountain': setup_terrain('mountain'),
+    'forest': setup_terrain('forest'),
+    'max_speed': setup_max_speed,
+    'dense_obstacles': setup_dense,
+}
+
+
+def new_state(setup, seed):
+    state = dino_game.GameState(seed)
+    state.dino_ai.enabled = True
+    setup(state)
+    return state
+
+
+def step_scenario(state, setup, seed):
+    # 遊戲結束時用同樣的設定重新開始，讓測試持續跑在同一個情境
+    if state.step():
+        state.reset(seed)
+        state.dino_ai.enabled = True
+        setup(state)
+        return True
+    return False
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    index = min(int(len(sorted_values) * p / 100), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def frame_stats(frame_times):
+    times = sorted(t * 1000 for t in frame_times)
+    total = sum(frame_times)
+    return {
+        'frames': len(times),
+        'fps': len(times) / total if total else 0.0,
+        'p50_ms': percentile(times, 50),
+        'p95_ms': percentile(times, 95),
+        'p99_ms': percentile(times, 99),
+        'max_ms': times[-1] if times else 0.0,
+    }
+
+
+def bench_simulation(setup, ticks, seed):
+    # 只跑模擬，不繪圖
+    state = new_state(setup, seed)
+    deaths = 0
+    start = time.perf_counter()
+    for _ in range(ticks):
+        deaths += step_scenario(state, setup, seed)
+    elapsed = time.perf_counter() - start
+    return {'ticks': ticks, 'ticks_per_sec': ticks / elapsed, 'deaths': deaths}
+
+
+def bench_render(window, setup, frames, seed):
+    # 每一幀：模擬一個 tick、繪製整個畫面並 flip
+    state = new_state(setup, seed)
+    renderer = dino_game.GameRenderer(window)
+    frame_times = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        step_scenario(state, setup, seed)
+        renderer.draw(state)
+        renderer.present()
+        pygame.event.pump()
+        frame_times.append(time.perf_counter() - start)
+    return frame_stats(frame_times)
+
+
+def bench_start_screen(window, frames):
+    frame_times = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        dino_game.draw_start_screen(window)
+        pygame.display.flip()
+        pygame.event.pump()
+        frame_times.append(time.perf_counter() - start)
+    return frame_stats(frame_times)
+
+
+# 在新的 Python 行程中量測冷啟動，每個工作行程和每次測試都要付這個成本
+STARTUP_SCRIPT = 'import json, dino_game; print(json.dumps(dino_game.measure_startup({render})))'
+
+
+def bench_startup(runs):
+    # 每種模式（無頭、有視窗）各啟動 runs 個行程，回傳每個階段的中位數（毫秒）
+    results = {}
+    for mode, render in (('headless', False), ('render', True)):
+        phases = {}
+        for _ in range(runs):
+            start = time.perf_counter()
+            output = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT.format(render=render)],
+                                    capture_output=True, text=True, check=True,
+                                    cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+            wall = time.perf_counter() - start
+            # pygame 在 import 時會印出歡迎訊息，結果在最後一行
+            for name, seconds in json.loads(output.splitlines()[-1]):
+                phases.setdefault(name, []).append(seconds * 1000)
+            phases.setdefault('process', []).append(wall * 1000)
+        results[mode] = {name: statistics.median(times) for name, times in phases.items()}
+    return results
+
+
+def print_startup(startup):
+    for mode, phases in startup.items():
+        text = '  '.join(f"{name} {ms:.1f}ms" for name, ms in phases.items())
+        print(f"startup {mode:<8} {text}")
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(scenarios, ticks, frames, seed, startup_runs):
+    dino_game.init_display()
+    window = pygame.display.set_mode((dino_game.WINDOW_WIDTH, dino_game.WINDOW_HEIGHT))
+    results = {}
+    for name in scenarios:
+        if name == 'start_screen':
+            results[name] = {'render': bench_start_screen(window, frames)}
+        else:
+            setup = SCENARIOS[name]
+            results[name] = {
+                'simulation': bench_simulation(setup, ticks, seed),
+                'render': bench_render(window, setup, frames, seed),
+            }
+        print_result(name, results[name])
+    startup = bench_startup(startup_runs) if startup_runs else {}
+    print_startup(startup)
+    return {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'platform': platform.platform(),
+        'seed': seed,
+        'scenarios': results,
+        'startup': startup,
+    }
+
+
+def print_result(name, result):
+    line = f"{name:<16}"
+    if 'simulation' in result:
+        line += f" sim {result['simulation']['ticks_per_sec']:>10.0f} ticks/s"
+    else:
+        line += " " * 22
+    render = result['render']
+    line += (f"  render {render['fps']:>7.1f} fps"
+             f"  p50 {render['p50_ms']:.2f}ms  p95 {render['p95_ms']:.2f}ms  p99 {render['p99_ms']:.2f}ms")
+    print(line)
+
+
+def compare(old, new):
+    # 與之前的結果比較，顯示變化百分比
+    print(f"Compare {old.get('commit')} -> {new.get('commit')}")
+    for name, result in new['scenarios'].items():
+        before = old['scenarios'].get(name)
+        if not before:
+            continue
+        parts = []
+        if 'simulation' in result and 'simulation' in before:
+            parts.append(('sim ticks/s', before['simulation']['ticks_per_sec'],
+                          result['simulation']['ticks_per_sec']))
+        parts.append(('fps', before['render']['fps'], result['render']['fps']))
+        parts.append(('p99 ms', before['render']['p99_ms'], result['render']['p99_ms']))
+        text = '  '.join(f"{label} {(b and (a - b) / b * 100):+.1f}%" for label, b, a in parts)
+        print(f"{name:<16} {text}")
+    for mode, phases in new.get('startup', {}).items():
+        before = old.get('startup', {}).get(mode)
+        if before and before.get('process'):
+            change = (phases['process'] - before['process']) / before['process'] * 100
+            print(f"startup {mode:<8} process {change:+.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Dino Run benchmark')
+    parser.add_argument('--scenario', action='append', choices=list(SCENARIOS) + ['start_screen'],
+                        help='只執行指定的情境（可重複），預設全部')
+    parser.add_argument('--ticks', type=int, default=20000, help='每個情境的模擬 tick 數')
+    parser.add_argument('--frames', type=int, default=1000, help='每個情境的繪圖幀數')
+    parser.add_argument('--seed', type=int, default=BENCH_SEED)
+    parser.add_argument('--output', default='bench_output.json', help='結果 JSON 檔')
+    parser.add_argument('--compare', metavar='JSON', help='與之前的結果比較')
+    parser.add_argument('--startup-runs', type=int, default=5,
+                        help='量測冷啟動（import、初始化、讀取圖片、第一幀）的行程數，0 表示不量測')
+    args = parser.parse_args()
+
+    scenarios = args.scenario or list(SCENARIOS) + ['start_screen']
+    results = run(scenarios, args.ticks, args.frames, args.seed, args.startup_runs)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(json.load(f), results)
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
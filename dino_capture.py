@@ -0,0 +1,243 @@
+import argparse
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+
+import pygame
+
+try:
+    import numpy
+except ImportError:  # 沒有 NumPy 時用 Python 的整數做 XOR（較慢，而且會佔住 GIL）
+    numpy = None
+
+# 錄影檔格式：
+#   檔頭：魔術字串、版本、寬、高、每列的 byte 數、每個像素的位元數、R/G/B 遮罩、關鍵幀間隔
+#   幀：幀頭（幀號、時間、是否為關鍵幀、資料長度）加上 zlib 壓縮的像素。關鍵幀是完整的畫面，
+#       其他幀是和上一個寫入的幀 XOR 的差異，沒變的地方都是 0，壓縮後很小
+#   索引：關閉時在最後寫入每個關鍵幀的幀號和位置，結尾是索引的位置、幀數、丟掉的幀數和魔術字串。
+#         從索引找到前面最近的關鍵幀就能跳到任何一幀；程式當掉沒有索引時從頭掃描
+# 幀號是遊戲送來的順序，丟掉的幀不會寫入，所以幀號可能不連續
+MAGIC = b'DINC'
+VERSION = 1
+HEADER = struct.Struct('<4sBHHHBIIIH')
+FRAME = struct.Struct('<IdBI')
+INDEX_ENTRY = struct.Struct('<IQ')
+FOOTER = struct.Struct('<QIII4s')
+
+
+def xor_frames(a, b, out):
+    # 回傳 a ^ b；有 NumPy 時直接寫進 out（運算時不佔住 GIL，遊戲執行緒可以同時執行）
+    if numpy is not None:
+        numpy.bitwise_xor(numpy.frombuffer(a, numpy.uint8), numpy.frombuffer(b, numpy.uint8),
+                          out=numpy.frombuffer(out, numpy.uint8))
+        return out
+    return bytearray((int.from_bytes(a, 'little') ^ int.from_bytes(b, 'little')).to_bytes(len(a), 'little'))
+
+
+class FrameCapture:
+    # 遊戲執行緒只把畫面複製到預先配置的緩衝區（一次 memcpy），差異編碼、壓縮和寫檔都在背景執行緒。
+    # 緩衝區都在使用中（背景執行緒跟不上）時丟掉這一幀並計數，遊戲循環不會等待
+    def __init__(self, path, surface, buffers=8, keyframe_interval=60, level=1):
+        self.path = path
+        self.size = surface.get_size()
+        self.pitch = surface.get_pitch()
+        self.keyframe_interval = keyframe_interval
+        self.level = level
+        self.frame_bytes = self.pitch * self.size[1]
+        self.free = queue.Queue()
+        for _ in range(max(buffers, 2)):  # 背景執行緒要保留上一幀做差異，至少需要兩個
+            self.free.put(bytearray(self.frame_bytes))
+        self.pending = queue.Queue()
+
+        self.frame = 0     # 遊戲送來的幀數（包括丟掉的）
+        self.written = 0   # 寫入檔案的幀數
+        self.dropped = 0
+        self.start = time.perf_counter()
+
+        self.file = open(path, 'wb')
+        masks = surface.get_masks()
+        self.file.write(HEADER.pack(MAGIC, VERSION, self.size[0], self.size[1], self.pitch,
+                                    surface.get_bitsize(), masks[0], masks[1], masks[2],
+                                    keyframe_interval))
+        self.thread = threading.Thread(target=self._run, name='frame-capture', daemon=True)
+        self.thread.start()
+
+    def capture(self, surface):
+        # 在遊戲執行緒呼叫，畫面畫好之後；回傳這一幀是否被保留
+        frame = self.frame
+        self.frame += 1
+        try:
+            buffer = self.free.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            return False
+        # 直接讀取 Surface 的像素記憶體，不經過 tobytes 建立新的 bytes
+        view = surface.get_view('1')
+        memoryview(buffer)[:] = memoryview(view).cast('B')
+        del view  # 釋放 view 才會解除 Surface 的鎖定
+        self.pending.put((frame, time.perf_counter() - self.start, buffer))
+        return True
+
+    def close(self):
+        self.pending.put(None)
+        self.thread.join()
+
+    def _run(self):
+        f = self.file
+        free = self.free
+        previous = None
+        delta = bytearray(self.frame_bytes)
+        index = []
+        while True:
+            item = self.pending.get()
+            if item is None:
+                break
+            frame, timestamp, buffer = item
+            offset = f.tell()
+            if previous is None or self.written % self.keyframe_interval == 0:
+                data = zlib.compress(buffer, self.level)
+                index.append(INDEX_ENTRY.pack(frame, offset))
+                keyframe = True
+            else:
+                data = zlib.compress(xor_frames(buffer, previous, delta), self.level)
+                keyframe = False
+            f.write(FRAME.pack(frame, timestamp, keyframe, len(data)))
+            f.write(data)
+            if previous is not None:
+                free.put(previous)
+            previous = buffer
+            self.written += 1
+
+        index_offset = f.tell()
+        f.write(b''.join(index))
+        f.write(FOOTER.pack(index_offset, len(index), self.written, self.dropped, MAGIC))
+        f.close()
+
+
+class CaptureReader:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        data = self.file.read(HEADER.size)
+        if len(data) < HEADER.size:
+            raise ValueError(f"{path} is truncated")
+        (magic, version, width, height, self.pitch, self.bitsize,
+         rmask, gmask, bmask, self.keyframe_interval) = HEADER.unpack(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a Dino Run capture (version {VERSION})")
+        self.size = (width, height)
+        self.masks = (rmask, gmask, bmask, 0)
+        self.file.seek(0, os.SEEK_END)
+        self.end = self.file.tell()
+        # 完整關閉的檔案從結尾的索引讀取，否則掃描整個檔案
+        self.frames = self.dropped = None
+        self.complete = self._read_index()
+        if not self.complete:
+            self._scan()
+
+    def _read_index(self):
+        if self.end < HEADER.size + FOOTER.size:
+            return False
+        self.file.seek(self.end - FOOTER.size)
+        index_offset, count, frames, dropped, magic = FOOTER.unpack(self.file.read(FOOTER.size))
+        if magic != MAGIC or index_offset + count * INDEX_ENTRY.size != self.end - FOOTER.size:
+            return False
+        self.file.seek(index_offset)
+        data = self.file.read(count * INDEX_ENTRY.size)
+        self.keyframes = [INDEX_ENTRY.unpack_from(data, i * INDEX_ENTRY.size) for i in range(count)]
+        self.end = index_offset
+        self.frames = frames
+        self.dropped = dropped
+        return True
+
+    def _scan(self):
+        # 沒有索引（錄影時當掉）：依序讀幀頭，到最後一個完整的幀為止
+        self.keyframes = []
+        frames = 0
+        offset = HEADER.size
+        while offset + FRAME.size <= self.end:
+            self.file.seek(offset)
+            frame, _, keyframe, length = FRAME.unpack(self.file.read(FRAME.size))
+            if offset + FRAME.size + length > self.end:
+                break
+            if keyframe:
+                self.keyframes.append((frame, offset))
+            frames += 1
+            offset += FRAME.size + length
+        self.end = offset
+        self.frames = frames
+
+    def read(self, start=0):
+        # 依序產生 (幀號, 時間, 像素) 從幀號 start 開始；先跳到前面最近的關鍵幀再套用差異。
+        # 像素的緩衝區會被下一幀覆蓋，要保留時請先複製
+        offset = None
+        for frame, keyframe_offset in self.keyframes:
+            if frame > start:
+                break
+            offset = keyframe_offset
+        if offset is None:
+            if not self.keyframes:
+                return
+            offset = self.keyframes[0][1]
+        pixels = None
+        while offset < self.end:
+            self.file.seek(offset)
+            frame, timestamp, keyframe, length = FRAME.unpack(self.file.read(FRAME.size))
+            data = zlib.decompress(self.file.read(length))
+            offset += FRAME.size + length
+            if keyframe:
+                pixels = bytearray(data)
+            else:
+                pixels = xor_frames(data, pixels, pixels)
+            if frame >= start:
+                yield frame, timestamp, pixels
+
+    def surface(self, pixels):
+        # 用錄影時的像素格式建立 Surface，直接寫入像素
+        surface = pygame.Surface(self.size, 0, self.bitsize, self.masks)
+        if surface.get_pitch() == self.pitch:
+            surface.get_buffer().write(bytes(pixels))
+        else:
+            row = self.size[0] * surface.get_bytesize()
+            buffer = surface.get_buffer()
+            for y in range(self.size[1]):
+                buffer.write(bytes(pixels[y * self.pitch:y * self.pitch + row]), y * surface.get_pitch())
+        return surface
+
+    def close(self):
+        self.file.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Decode a Dino Run frame capture')
+    parser.add_argument('path', help='錄影檔路徑（dino_game.py --capture 產生）')
+    parser.add_argument('--output', metavar='DIR', help='把每一幀存成 PNG 到這個資料夾')
+    parser.add_argument('--start', type=int, default=0, help='從這個幀號開始')
+    parser.add_argument('--count', type=int, help='最多輸出幾幀，預設到結尾')
+    args = parser.parse_args()
+
+    reader = CaptureReader(args.path)
+    width, height = reader.size
+    status = '' if reader.complete else ' (no index, recording was interrupted)'
+    print(f"{args.path}: {width}x{height}, {reader.frames} frames, "
+          f"{len(reader.keyframes)} keyframes, {os.path.getsize(args.path)} bytes{status}")
+    if reader.dropped:
+        print(f"Dropped {reader.dropped} frames while recording")
+
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+        written = 0
+        for frame, timestamp, pixels in reader.read(args.start):
+            if args.count is not None and written >= args.count:
+                break
+            pygame.image.save(reader.surface(pixels), os.path.join(args.output, f"frame{frame:06d}.png"))
+            written += 1
+        print(f"Wrote {written} frames to {args.output}")
+    reader.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,22 +1,40 @@
+import time
+
+# 啟動報告從這裡開始計時（包括 import pygame）
+_IMPORT_START = time.perf_counter()
+
 import pygame
 import random
 import ctypes
 import sys
 import os
+import hashlib
+import math
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from functools import lru_cache
 
-# 在 pygame.init() 之前添加以下代碼
-if sys.platform.startswith('win'):
-    try:
-        import win32api
-        import win32con
-        # 切換到英文輸入法
-        win32api.LoadKeyboardLayout('00000409', win32con.KLF_ACTIVATE)
-        print("已切換至英文輸入法")
-    except ImportError:
-        print("提示：請安裝 pywin32 以啟用自動切換輸入法功能")
-        print("可使用指令：pip install pywin32")
-
-# 設置默認中文字體
+from dino_log import LOG
+
+# import 這個模組不會有任何副作用：不初始化 pygame、不開視窗、不查找字體
+# 需要的子系統在第一次用到時才初始化（視窗用 init_display，字體由 TextCache 負責）
+
+
+def use_english_input():
+    # Windows 上切換到英文輸入法，避免中文輸入法吃掉按鍵；只有開啟遊戲視窗時才呼叫
+    if sys.platform.startswith('win'):
+        try:
+            import win32api
+            import win32con
+            # 切換到英文輸入法
+            win32api.LoadKeyboardLayout('00000409', win32con.KLF_ACTIVATE)
+            print("已切換至英文輸入法")
+        except ImportError:
+            print("提示：請安裝 pywin32 以啟用自動切換輸入法功能")
+            print("可使用指令：pip install pywin32")
+
+# 設置默認中文字體（第一次建立字體時才查找，結果會快取）
+@lru_cache(maxsize=None)
 def get_font_path():
     if sys.platform.startswith('win'):
         # Windows 系統字體路徑
@@ -39,15 +57,18 @@ def get_font_path():
             
     return None  # 如果找不到合適的字體，返回 None
 
-# 初始化 Pygame
-pygame.init()
-FONT_PATH = get_font_path()
+def init_display():
+    # 只初始化視窗和字體，不像 pygame.init() 連音效、搖桿都初始化；重複呼叫沒有影響
+    pygame.display.init()
+    pygame.font.init()
+
+def ticks_ms():
+    # 取代 pygame.time.get_ticks()：沒有呼叫 pygame.init() 時它永遠回傳 0
+    return int(time.perf_counter() * 1000)
 
 # 設定視窗大小
 WINDOW_WIDTH = 800
 WINDOW_HEIGHT = 400
-window = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
-pygame.display.set_caption("Dino Game")
 
 # 顏色定義
 WHITE = (255, 255, 255)
@@ -56,15 +77,67 @@ GRAY = (128, 128, 128)
 SKY_BLUE = (135, 206, 235)
 GROUND_COLOR = (83, 144, 83)
 
-# 在遊戲開始前添加這些調試信息
-print("Game Controls:")
-print("- SPACE/UP/W: Jump")
-print("- R: Restart when game over")
-print("- H: Toggle AI auto-jump")
-print("- ESC: Exit game")
 
+# 字體與文字快取：字體只建立一次，相同的文字只渲染一次
+class TextCache:
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.fonts = {}                # 大小 -> Font
+        self.rendered = OrderedDict()  # (大小, 文字, 顏色) -> Surface，依使用順序排列
+    
+    def font(self, size):
+        font = self.fonts.get(size)
+        if font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            font = pygame.font.Font(get_font_path(), size)  # 路徑為 None 時使用預設字體
+            self.fonts[size] = font
+        return font
+    
+    def render(self, text, size, color):
+        key = (size, text, color)
+        surface = self.rendered.get(key)
+        if surface is not None:
+            self.rendered.move_to_end(key)
+            return surface
+        
+        surface = self.font(size).render(text, True, color)
+        self.rendered[key] = surface
+        # 超過上限時移除最久沒用到的文字
+        if len(self.rendered) > self.max_entries:
+            self.rendered.popitem(last=False)
+        return surface
+    
+    def blit_number(self, surface, pos, prefix, value, suffix, size, color):
+        # 用快取的前綴、數字和後綴拼出文字，分數改變時不必重新渲染整串文字
+        x, y = pos
+        pieces = [prefix]
+        pieces.extend(str(value))
+        pieces.append(suffix)
+        for piece in pieces:
+            piece_surface = self.render(piece, size, color)
+            surface.blit(piece_surface, (x, y))
+            x += piece_surface.get_width()
+        return pygame.Rect(pos[0], y, x - pos[0], self.font(size).get_linesize())
+
+TEXT = TextCache()
 
 # 在主遊戲循環之前添加開始畫面函數
+# 開始畫面的示範恐龍和控制說明的半透明背景：第一次畫開始畫面時建立，之後每幀重複使用
+@lru_cache(maxsize=None)
+def start_screen_dino():
+    demo_dino = Dino()
+    demo_dino.x = WINDOW_WIDTH//2 - 100
+    demo_dino.y = WINDOW_HEIGHT//2
+    return demo_dino
+
+@lru_cache(maxsize=None)
+def start_screen_panel():
+    control_surface = pygame.Surface((300, 80))  # 從 (400, 100) 改為 (300, 80)
+    control_surface.fill(WHITE)
+    control_surface.set_alpha(180)
+    return control_surface
+
 def draw_start_screen(surface, font_size=36):
     # 繪製背景
     surface.fill(SKY_BLUE)
@@ -85,19 +158,11 @@ def draw_start_screen(surface, font_size=36):
     pygame.draw.rect(surface, GROUND_COLOR, 
                     (0, ground_y, WINDOW_WIDTH, WINDOW_HEIGHT - ground_y))
     
-    # 使用較小的字體大小
-    if FONT_PATH:
-        font = pygame.font.Font(FONT_PATH, 24)        # 從 36 改為 24
-        title_font = pygame.font.Font(FONT_PATH, 48)  # 從 72 改為 48
-    else:
-        font = pygame.font.Font(None, 24)
-        title_font = pygame.font.Font(None, 48)
-    
-    # 顯示遊戲標題
+    # 顯示遊戲標題（使用較小的字體大小：從 72 改為 48）
     title = 'Dino Run'
     shadow_color = (100, 100, 100)
-    title_shadow = title_font.render(title, True, shadow_color)
-    title_text = title_font.render(title, True, BLACK)
+    title_shadow = TEXT.render(title, 48, shadow_color)
+    title_text = TEXT.render(title, 48, BLACK)
     
     title_x = WINDOW_WIDTH//2 - title_text.get_width()//2
     title_y = WINDOW_HEIGHT//4
@@ -107,15 +172,12 @@ def draw_start_screen(surface, font_size=36):
     surface.blit(title_text, (title_x, title_y))
     
     # 繪製示例恐龍
-    demo_dino = Dino()
-    demo_dino.x = WINDOW_WIDTH//2 - 100
-    demo_dino.y = WINDOW_HEIGHT//2
-    demo_dino.draw(surface)
+    start_screen_dino().draw(surface)
     
     # 顯示開始提示（閃爍效果）
-    current_time = pygame.time.get_ticks()
+    current_time = ticks_ms()
     if (current_time // 500) % 2:  # 每500毫秒切換一次
-        start_text = font.render('Press any key to start', True, BLACK)
+        start_text = TEXT.render('Press any key to start', 24, BLACK)  # 從 36 改為 24
         surface.blit(start_text, 
                     (WINDOW_WIDTH//2 - start_text.get_width()//2, 
                      WINDOW_HEIGHT*2//3))
@@ -129,23 +191,21 @@ def draw_start_screen(surface, font_size=36):
     ]
     
     # 調整控制說明背景的大小
-    control_surface = pygame.Surface((300, 80))  # 從 (400, 100) 改為 (300, 80)
-    control_surface.fill(WHITE)
-    control_surface.set_alpha(180)
-    surface.blit(control_surface, 
+    surface.blit(start_screen_panel(), 
                 (WINDOW_WIDTH//2 - 150, WINDOW_HEIGHT*3//4 - 10))
     
     # 繪製控制說明文字，使用較小的行距
     for i, text in enumerate(controls):
-        control_text = font.render(text, True, BLACK)
+        control_text = TEXT.render(text, 24, BLACK)
         surface.blit(control_text, 
                     (WINDOW_WIDTH//2 - control_text.get_width()//2, 
                      WINDOW_HEIGHT*3//4 + i*20))  # 行距從 30 改為 20
 
 # 在主遊戲循環前添加開始畫面循環
-def show_start_screen():
+def show_start_screen(display):
     waiting = True
     clock = pygame.time.Clock()
+    first_frame = True
     
     while waiting:
         for event in pygame.event.get():
@@ -155,19 +215,91 @@ def show_start_screen():
                 waiting = False
                 return True
         
-        draw_start_screen(window, 36)
-        pygame.display.flip()
+        draw_start_screen(display.surface, 36)
+        display.present()
+        if first_frame:
+            STARTUP.mark('start screen')
+            first_frame = False
         clock.tick(60)
 
+# 各種背景元素的視差捲動速度（相對於地面速度）
+PARALLAX_FACTORS = {
+    'cloud': 0.5,
+    'mountain': 0.2,
+    'tree': 0.8,
+    'grass': 1,
+}
+
+# 繪製單一地形元素，x 為元素左側在目標 Surface 上的位置
+def draw_terrain_element(surface, element, x, ground_y):
+    if element['type'] == 'mountain':
+        color = (100, 100, 100)
+        points = [
+            (x, ground_y),
+            (x + element['width']//2, ground_y - element['height']),
+            (x + element['width'], ground_y)
+        ]
+        pygame.draw.polygon(surface, color, points)
+    
+    elif element['type'] == 'tree':
+        # 樹幹
+        trunk_color = (139, 69, 19)
+        trunk_width = element['width'] // 3
+        trunk_height = element['height'] // 2
+        pygame.draw.rect(surface, trunk_color,
+                       (x + element['width']//3,
+                        ground_y - trunk_height,
+                        trunk_width, trunk_height))
+        
+        # 樹冠
+        crown_color = (34, 139, 34)
+        points = [
+            (x, ground_y - trunk_height),
+            (x + element['width']//2, ground_y - element['height']),
+            (x + element['width'], ground_y - trunk_height)
+        ]
+        pygame.draw.polygon(surface, crown_color, points)
+    
+    else:  # grass
+        color = (50, 205, 50)
+        points = [
+            (x, ground_y),
+            (x + element['width']//2, ground_y - element['height']),
+            (x + element['width'], ground_y)
+        ]
+        pygame.draw.polygon(surface, color, points)
+
+# 繪製單朵雲，x、y 為雲在目標 Surface 上的位置
+def draw_cloud(surface, cloud, x, y):
+    pygame.draw.ellipse(surface, WHITE, 
+                      (x, y, cloud['width'], cloud['width']*0.6))
+
+# 地形依序循環：平原 → 山地 → 森林（背景和障礙物路線共用）
+def next_terrain(terrain_type):
+    terrains = ['plains', 'mountain', 'forest']
+    current_index = terrains.index(terrain_type)
+    next_index = (current_index + 1) % len(terrains)
+    return terrains[next_index]
+
 # 添加背景類
 class Background:
-    def __init__(self):
+    def __init__(self, rng=None):
+        # rng：景物專用的亂數產生器，固定種子就能重現同樣的景物
+        # 景物只影響畫面，不和障礙物共用亂數，所以快照不需要包含景物
+        self.rng = rng if rng is not None else random.Random()
         self.ground_y = WINDOW_HEIGHT - 50
         self.cloud_list = []
         self.terrain_elements = []
         self.terrain_type = 'plains'  # 當前地形
         self.next_change = 100  # 下一次改變的距離
         
+        # 給預先繪製的視差圖層使用：累計捲動距離、地形重建次數、最近移到右側的元素
+        self.scrolled = 0
+        self.prev_scrolled = 0
+        self.version = 0
+        self.wrap_count = 0
+        self.recent_wraps = deque(maxlen=64)
+        
         # 地形顏色設定
         self.terrain_colors = {
             'plains': (83, 144, 83),     # 草原：淺綠
@@ -181,64 +313,71 @@ class Background:
     
     def generate_terrain(self):
         self.terrain_elements = self.generate_terrain_elements(self.terrain_type)
+        self.version += 1
     
     def change_terrain(self):
-        # 直接切換到下一個地形
-        terrains = ['plains', 'mountain', 'forest']
-        current_index = terrains.index(self.terrain_type)
-        next_index = (current_index + 1) % len(terrains)
-        self.terrain_type = terrains[next_index]
+        self.advance_terrain()
         
         # 立即生成新地形
         self.generate_terrain()
+    
+    def advance_terrain(self):
+        # 直接切換到下一個地形（只改變地形類型，不生成景物）
+        self.terrain_type = next_terrain(self.terrain_type)
         
         # 設置下次改變的距離
         self.next_change += 100
     
-    def update(self, speed, current_distance):
-        # 檢查是否需要改變地形
-        if current_distance >= self.next_change:
-            self.change_terrain()
+    def update(self, speed):
+        # 地形的改變由 GameState 依照障礙物路線決定，這裡只捲動景物
+        self.prev_scrolled = self.scrolled
+        self.scrolled += speed
         
-        # 更新元素位置
-        for element in self.terrain_elements[:]:
-            if element['type'] == 'mountain':
-                element['x'] -= speed * 0.2
-            elif element['type'] == 'tree':
-                element['x'] -= speed * 0.8
-            else:  # grass
-                element['x'] -= speed
+        # 更新元素位置；移到右側的元素改成最後畫，和視差圖層把它畫在其他元素上面的順序相同
+        wrapped = []
+        for element in self.terrain_elements:
+            element['x'] -= speed * PARALLAX_FACTORS[element['type']]
             
             # 如果元素移出畫面，在右側重新生成
             if element['x'] + element['width'] < 0:
                 element['x'] = WINDOW_WIDTH
                 if element['type'] == 'mountain':
-                    element['height'] = random.randint(100, 180)
-                    element['width'] = random.randint(120, 200)
+                    element['height'] = self.rng.randint(100, 180)
+                    element['width'] = self.rng.randint(120, 200)
                 elif element['type'] == 'tree':
-                    element['height'] = random.randint(60, 100)
+                    element['height'] = self.rng.randint(60, 100)
                     element['width'] = element['height'] // 2
                 else:  # grass
-                    element['height'] = random.randint(5, 15)
-                    element['width'] = random.randint(20, 40)
+                    element['height'] = self.rng.randint(5, 15)
+                    element['width'] = self.rng.randint(20, 40)
+                self.wrap_count += 1
+                self.recent_wraps.append(element)
+                wrapped.append(element)
         
         # 更新雲朵
         for cloud in self.cloud_list:
-            cloud['x'] -= speed * 0.5
+            cloud['x'] -= speed * PARALLAX_FACTORS['cloud']
             if cloud['x'] + cloud['width'] < 0:
                 cloud['x'] = WINDOW_WIDTH
-                cloud['y'] = random.randint(50, 150)
-                cloud['width'] = random.randint(40, 70)
+                cloud['y'] = self.rng.randint(50, 150)
+                cloud['width'] = self.rng.randint(40, 70)
+                self.wrap_count += 1
+                self.recent_wraps.append(cloud)
+                wrapped.append(cloud)
+        
+        for element in wrapped:
+            elements = self.cloud_list if element['type'] == 'cloud' else self.terrain_elements
+            elements.remove(element)
+            elements.append(element)
     
     def draw(self, surface):
+        # 逐一繪製所有元素（視窗遊戲使用 ParallaxBackground 的預先繪製圖層）
         # 繪製天空
         surface.fill(SKY_BLUE)
         
         # 繪製雲朵
         for cloud in self.cloud_list:
-            pygame.draw.ellipse(surface, WHITE, 
-                              (cloud['x'], cloud['y'], 
-                               cloud['width'], cloud['width']*0.6))
+            draw_cloud(surface, cloud, cloud['x'], cloud['y'])
         
         # 繪製地面
         pygame.draw.rect(surface, self.terrain_colors[self.terrain_type], 
@@ -246,50 +385,15 @@ class Background:
         
         # 繪製地形元素
         for element in self.terrain_elements:
-            if element['type'] == 'mountain':
-                color = (100, 100, 100)
-                points = [
-                    (element['x'], self.ground_y),
-                    (element['x'] + element['width']//2, self.ground_y - element['height']),
-                    (element['x'] + element['width'], self.ground_y)
-                ]
-                pygame.draw.polygon(surface, color, points)
-            
-            elif element['type'] == 'tree':
-                # 樹幹
-                trunk_color = (139, 69, 19)
-                trunk_width = element['width'] // 3
-                trunk_height = element['height'] // 2
-                pygame.draw.rect(surface, trunk_color,
-                               (element['x'] + element['width']//3,
-                                self.ground_y - trunk_height,
-                                trunk_width, trunk_height))
-                
-                # 樹冠
-                crown_color = (34, 139, 34)
-                points = [
-                    (element['x'], self.ground_y - trunk_height),
-                    (element['x'] + element['width']//2, self.ground_y - element['height']),
-                    (element['x'] + element['width'], self.ground_y - trunk_height)
-                ]
-                pygame.draw.polygon(surface, crown_color, points)
-            
-            else:  # grass
-                color = (50, 205, 50)
-                points = [
-                    (element['x'], self.ground_y),
-                    (element['x'] + element['width']//2, self.ground_y - element['height']),
-                    (element['x'] + element['width'], self.ground_y)
-                ]
-                pygame.draw.polygon(surface, color, points)
+            draw_terrain_element(surface, element, element['x'], self.ground_y)
     
     def generate_terrain_elements(self, terrain_type):
         elements = []
         if terrain_type == 'mountain':
-            for _ in range(random.randint(3, 5)):
-                x = random.randint(0, WINDOW_WIDTH)
-                height = random.randint(100, 180)
-                width = random.randint(120, 200)
+            for _ in range(self.rng.randint(3, 5)):
+                x = self.rng.randint(0, WINDOW_WIDTH)
+                height = self.rng.randint(100, 180)
+                width = self.rng.randint(120, 200)
                 elements.append({
                     'type': 'mountain',
                     'x': x,
@@ -297,9 +401,9 @@ class Background:
                     'width': width
                 })
         elif terrain_type == 'forest':
-            for _ in range(random.randint(6, 10)):
-                x = random.randint(0, WINDOW_WIDTH)
-                height = random.randint(60, 100)
+            for _ in range(self.rng.randint(6, 10)):
+                x = self.rng.randint(0, WINDOW_WIDTH)
+                height = self.rng.randint(60, 100)
                 elements.append({
                     'type': 'tree',
                     'x': x,
@@ -307,29 +411,171 @@ class Background:
                     'width': height // 2
                 })
         else:  # plains
-            for _ in range(random.randint(15, 20)):
-                x = random.randint(0, WINDOW_WIDTH)
-                height = random.randint(5, 15)
+            for _ in range(self.rng.randint(15, 20)):
+                x = self.rng.randint(0, WINDOW_WIDTH)
+                height = self.rng.randint(5, 15)
                 elements.append({
                     'type': 'grass',
                     'x': x,
                     'height': height,
-                    'width': random.randint(20, 40)
+                    'width': self.rng.randint(20, 40)
                 })
         return elements
     
     def generate_clouds(self):
         # 生成3-5朵雲
-        for _ in range(random.randint(3, 5)):
-            x = random.randint(0, WINDOW_WIDTH)
-            y = random.randint(50, 150)
-            width = random.randint(40, 70)
+        for _ in range(self.rng.randint(3, 5)):
+            x = self.rng.randint(0, WINDOW_WIDTH)
+            y = self.rng.randint(50, 150)
+            width = self.rng.randint(40, 70)
             self.cloud_list.append({
+                'type': 'cloud',
                 'x': x,
                 'y': y,
                 'width': width
             })
 
+# 預先繪製的視差圖層：每一層畫在一張寬的 Surface 上，每幀只需要一次 blit
+class ParallaxBand:
+    # 圖層切成數塊：新元素只會讓它所在的那幾塊重新編碼，每幀只需要兩三次 blit
+    # 總寬度涵蓋視窗寬度加上最大元素寬度，並預留一個視窗寬度的捲動空間
+    TILE_WIDTH = WINDOW_WIDTH // 2
+    TILE_COUNT = 5
+    LEFT_MARGIN = 16  # 插值時捲動距離可能略小於重建時的位置，左側預留一點空間
+    COLORKEY = (255, 0, 255)
+
+    def __init__(self, kind, top, height, ground_y):
+        self.kind = kind
+        self.factor = PARALLAX_FACTORS[kind]
+        self.top = top
+        self.ground_y = ground_y - top  # 圖層內的地面位置
+        self.tiles = []
+        for _ in range(self.TILE_COUNT):
+            tile = pygame.Surface((self.TILE_WIDTH, height))
+            tile.set_colorkey(self.COLORKEY, pygame.RLEACCEL)
+            self.tiles.append(tile)
+        self.origin = 0   # 上次重建時背景的累計捲動距離
+        self.empty = True
+    
+    def offset(self, background, alpha=1):
+        # 自上次重建後這一層已經捲動的距離，alpha 用於兩個 tick 之間的插值
+        scrolled = background.prev_scrolled + (background.scrolled - background.prev_scrolled) * alpha
+        return (scrolled - self.origin) * self.factor
+    
+    def rebuild(self, elements, background):
+        for tile in self.tiles:
+            tile.fill(self.COLORKEY)
+        self.origin = background.scrolled
+        self.empty = True
+        for element in elements:
+            self.add(element, 0)
+    
+    def add(self, element, offset):
+        # 把新進入畫面的元素畫到圖層上對應的位置，不用重畫整層
+        x = element['x'] + offset + self.LEFT_MARGIN
+        first = max(int(x) // self.TILE_WIDTH, 0)
+        last = min(int(x + element['width']) // self.TILE_WIDTH, self.TILE_COUNT - 1)
+        for index in range(first, last + 1):
+            tile = self.tiles[index]
+            tile_x = x - index * self.TILE_WIDTH
+            if self.kind == 'cloud':
+                draw_cloud(tile, element, tile_x, element['y'] - self.top)
+            else:
+                draw_terrain_element(tile, element, tile_x, self.ground_y)
+        self.empty = False
+    
+    def draw(self, surface, offset):
+        if self.empty:
+            return
+        offset = int(offset) + self.LEFT_MARGIN
+        first = max(offset // self.TILE_WIDTH, 0)
+        last = min((offset + WINDOW_WIDTH) // self.TILE_WIDTH, self.TILE_COUNT - 1)
+        for index in range(first, last + 1):
+            surface.blit(self.tiles[index], (index * self.TILE_WIDTH - offset, self.top))
+
+class ParallaxBackground:
+    def __init__(self):
+        ground_y = WINDOW_HEIGHT - 50
+        # 每一層只涵蓋元素可能出現的高度範圍（雲朵 y 在 50-150 之間，高度最多 42）。
+        # 地形元素的底邊畫在 ground_y 那一列上，所以地形的圖層多一列
+        self.bands = {
+            'cloud': ParallaxBand('cloud', 50, 100 + 42, ground_y),
+            'mountain': ParallaxBand('mountain', ground_y - 180, 180 + 1, ground_y),
+            'tree': ParallaxBand('tree', ground_y - 100, 100 + 1, ground_y),
+            'grass': ParallaxBand('grass', ground_y - 15, 15 + 1, ground_y),
+        }
+        self.background = None
+        self.version = None
+        self.wrap_count = 0
+        # 畫質設定：是否畫雲、畫出的地形元素比例（其餘元素放在 hidden，不畫到圖層上）
+        self.clouds = True
+        self.detail = 1.0
+        self.hidden = set()
+    
+    def set_quality(self, clouds, detail):
+        self.clouds = clouds
+        if detail != self.detail:
+            self.detail = detail
+            self.background = None  # 下一幀用新的比例重建所有圖層
+    
+    def rebuild(self, background):
+        # 新的地形使用新的元素，舊元素的 id 可能被重複使用，所以整個清掉
+        self.hidden.clear()
+        for kind, band in self.bands.items():
+            self.rebuild_band(band, background)
+        self.background = background
+        self.version = background.version
+        self.wrap_count = background.wrap_count
+    
+    def rebuild_band(self, band, background):
+        if band.kind == 'cloud':
+            elements = background.cloud_list
+        else:
+            elements = [e for e in background.terrain_elements if e['type'] == band.kind]
+            # 降低畫質時只畫一部分元素，隱藏的元素移到右側後也不畫
+            keep = max(int(len(elements) * self.detail), 1) if elements else 0
+            self.hidden.update(id(element) for element in elements[keep:])
+            elements = elements[:keep]
+        band.rebuild(elements, background)
+    
+    def sync(self, background):
+        # 新的背景或地形改變時重建所有圖層，否則只補畫新進入畫面的元素
+        new_wraps = background.wrap_count - self.wrap_count
+        if (background is not self.background or background.version != self.version or
+                new_wraps > len(background.recent_wraps)):
+            self.rebuild(background)
+            return
+        
+        if new_wraps:
+            for element in list(background.recent_wraps)[-new_wraps:]:
+                if id(element) in self.hidden:
+                    continue
+                band = self.bands[element['type']]
+                band.add(element, band.offset(background))
+            self.wrap_count = background.wrap_count
+        
+        # 捲動超過預留空間時重建該層
+        for band in self.bands.values():
+            if band.offset(background) > WINDOW_WIDTH:
+                self.rebuild_band(band, background)
+    
+    def draw(self, surface, background, alpha=1):
+        self.sync(background)
+        bands = self.bands
+        
+        # 繪製天空和雲朵
+        surface.fill(SKY_BLUE)
+        if self.clouds:
+            bands['cloud'].draw(surface, bands['cloud'].offset(background, alpha))
+        
+        # 繪製地面
+        pygame.draw.rect(surface, background.terrain_colors[background.terrain_type], 
+                        (0, background.ground_y, WINDOW_WIDTH, WINDOW_HEIGHT - background.ground_y))
+        
+        # 繪製地形元素
+        for kind in ('mountain', 'tree', 'grass'):
+            bands[kind].draw(surface, bands[kind].offset(background, alpha))
+
 # 在顏色定義後添加圖片載入相關代碼
 def load_sprite_sheet(filename, cols, rows):
     # 載入完整的 sprite sheet
@@ -353,43 +599,143 @@ def load_sprite_sheet(filename, cols, rows):
 # 在文件開頭添加圖片路徑設置
 GAME_ROOT = os.path.dirname(__file__)
 IMAGE_ROOT = os.path.join(GAME_ROOT, 'images')
+# 預先縮放、繪製好的圖片（python dino_atlas.py 產生），不存在或過期時讀取 PNG
+ATLAS_PATH = os.path.join(IMAGE_ROOT, 'sprites.atlas')
+# 圖集的版本：改變繪製圖片的程式碼（Obstacle.create_*）時要加一，讓舊的圖集過期
+ATLAS_VERSION = 1
+
+# 全域圖片快取：每張圖片只讀取、縮放、轉換一次，所有物件共用同一個 Surface
+class AssetCache:
+    def __init__(self, use_atlas=True):
+        self.originals = {}  # 圖片名稱 -> 原始圖片
+        self.surfaces = {}   # (圖片名稱, 尺寸) -> 縮放後的圖片
+        self.timings = {}    # (圖片名稱, 尺寸) -> (讀取毫秒, 縮放毫秒)
+        self.masks = {}      # (圖片名稱, 尺寸) -> 碰撞遮罩
+        self.use_atlas = use_atlas
+        self.atlas = None    # (圖片名稱, 尺寸) -> 圖集中的圖片，第一次需要圖片時才讀取
+    
+    def get(self, name, size, fallback=None):
+        # 從 images/<name>.png 讀取；失敗時使用 fallback(size) 或紫色方塊
+        surface = self.surfaces.get((name, size))
+        if surface is None:
+            surface = self._load(name, size, fallback)
+        return surface
+    
+    def get_drawn(self, name, size, create):
+        # 程序繪製的圖片（例如岩石），只繪製一次
+        surface = self.surfaces.get((name, size))
+        if surface is None:
+            start = time.perf_counter()
+            baked = self._from_atlas(name, size)
+            if baked is not None:
+                surface = self._finish(baked)
+                self._store(name, size, surface, time.perf_counter() - start, 0.0)
+            else:
+                surface = self._finish(create(*size))
+                self._store(name, size, surface, 0.0, time.perf_counter() - start)
+        return surface
+    
+    def mask(self, name, size, create=None, drawn=False):
+        # 碰撞遮罩：每張圖片只建立一次，不需要視窗，無頭模擬也能使用
+        # drawn 為 True 時使用 create 繪製的圖片；讀檔失敗時使用 create 或整個方塊
+        key = (name, size)
+        mask = self.masks.get(key)
+        if mask is None:
+            baked = self._from_atlas(name, size)
+            if baked is not None:
+                mask = pygame.mask.from_surface(baked)
+            elif drawn:
+                mask = pygame.mask.from_surface(create(*size))
+            else:
+                try:
+                    mask = pygame.mask.from_surface(pygame.transform.scale(self._original(name), size))
+                except (pygame.error, OSError):
+                    if create is not None:
+                        mask = pygame.mask.from_surface(create(*size))
+                    else:
+                        mask = pygame.mask.Mask(size, fill=True)
+            self.masks[key] = mask
+        return mask
+    
+    def _from_atlas(self, name, size):
+        if self.atlas is None:
+            self.atlas = {}
+            if self.use_atlas:
+                import dino_atlas
+                self.atlas = dino_atlas.load_atlas(ATLAS_PATH, atlas_sources(), atlas_recipe()) or {}
+        return self.atlas.get((name, size))
+    
+    def _original(self, name):
+        original = self.originals.get(name)
+        if original is None:
+            original = pygame.image.load(os.path.join(IMAGE_ROOT, f'{name}.png'))
+            self.originals[name] = original
+        return original
+    
+    def _load(self, name, size, fallback):
+        start = time.perf_counter()
+        baked = self._from_atlas(name, size)
+        if baked is not None:
+            surface = self._finish(baked)
+            self._store(name, size, surface, time.perf_counter() - start, 0.0)
+            return surface
+        try:
+            original = self._original(name)
+            loaded = time.perf_counter()
+            surface = pygame.transform.scale(original, size)
+        except (pygame.error, OSError) as e:
+            LOG.warning("Failed to load %s image: %s", name, e)
+            loaded = time.perf_counter()
+            if fallback is not None:
+                surface = fallback(*size)
+            else:
+                # 使用臨時的紫色方塊作為替代
+                surface = pygame.Surface(size, pygame.SRCALPHA)
+                surface.fill((255, 0, 255))
+        surface = self._finish(surface)
+        self._store(name, size, surface, loaded - start, time.perf_counter() - loaded)
+        return surface
+    
+    def _finish(self, surface):
+        # 有視窗時才能 convert_alpha，轉換後 blit 速度較快
+        if pygame.display.get_init() and pygame.display.get_surface() is not None:
+            surface = surface.convert_alpha()
+        return surface
+    
+    def _store(self, name, size, surface, load_time, scale_time):
+        self.surfaces[(name, size)] = surface
+        self.timings[(name, size)] = (load_time * 1000, scale_time * 1000)
+    
+    def report(self):
+        # 回傳每張圖片的讀取與縮放時間（從圖集取得的圖片沒有縮放時間）
+        lines = [f"Sprite atlas: {len(self.atlas)} images"] if self.atlas else []
+        for (name, size), (load_ms, scale_ms) in self.timings.items():
+            lines.append(f"{name} {size[0]}x{size[1]}: load {load_ms:.2f}ms, scale {scale_ms:.2f}ms")
+        total = sum(load_ms + scale_ms for load_ms, scale_ms in self.timings.values())
+        lines.append(f"Total asset time: {total:.2f}ms")
+        return lines
+
+ASSETS = AssetCache()
+
+# 恐龍跑步動畫的圖片
+DINO_RUN_FRAMES = ('dino_run', 'dino_run2')
 
 # 修改 Dino 類
 class Dino:
     def __init__(self):
         self.x = 50
-        self.y = WINDOW_HEIGHT - 100
+        self.ground_y = WINDOW_HEIGHT - 100
+        self.y = self.ground_y
+        self.prev_y = self.y  # 上一個 tick 的位置，用於插值繪製
         self.jump_speed = 0
         self.is_jumping = False
+        self.jump_velocity = -15  # 起跳速度
+        self.gravity = 0.8        # 每個 tick 增加的下落速度
         
         # 置恐龍期望的小
         self.width = 40  # 縮小寬度
         self.height = 44  # 縮小高度
         
-        try:
-            # 載入並縮放圖片
-            run_frames_original = [
-                pygame.image.load(os.path.join(IMAGE_ROOT, 'dino_run.png')),
-                pygame.image.load(os.path.join(IMAGE_ROOT, 'dino_run2.png'))
-            ]
-            jump_image_original = pygame.image.load(os.path.join(IMAGE_ROOT, 'dino_jump.png'))
-            
-            # 縮放所有圖片到指定大小
-            self.run_frames = [
-                pygame.transform.scale(img, (self.width, self.height))
-                for img in run_frames_original
-            ]
-            self.jump_image = pygame.transform.scale(jump_image_original, (self.width, self.height))
-            
-        except pygame.error as e:
-            print(f"Failed to load dinosaur image: {e}")
-            # 使用臨時的紫色方塊作為替代
-            self.run_frames = [pygame.Surface((self.width, self.height), pygame.SRCALPHA) for _ in range(2)]
-            self.jump_image = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
-            for img in self.run_frames + [self.jump_image]:
-                img.fill((255, 0, 255))  # 紫色
-        
-        self.image = self.run_frames[0]  # 前
         self.distance = 0
         self.speed = 5
         self.max_speed = 12  # 設置最大速度為12
@@ -399,30 +745,45 @@ class Dino:
         self.animation_speed = 0.2
         self.acceleration = 0.2  # 每100米增加的速度
 
+    @property
+    def frame_name(self):
+        # 目前使用的圖片：跳躍中用跳躍圖，否則用跑步動畫
+        if self.is_jumping:
+            return 'dino_jump'
+        return DINO_RUN_FRAMES[int(self.animation_frame)]
+
+    @property
+    def image(self):
+        # 依照目前狀態從共用快取選擇圖片，無頭模擬時不會讀取任何圖片
+        return ASSETS.get(self.frame_name, (self.width, self.height))
+
+    @property
+    def mask(self):
+        # 目前圖片的碰撞遮罩（預先建立，和圖片一一對應）
+        return ASSETS.mask(self.frame_name, (self.width, self.height))
+
     def jump(self):
         if not self.is_jumping:
-            print("Jump executed!")
-            self.jump_speed = -15
-            self.is_jumping = True
-            self.image = self.jump_image  # 立即切換到跳躍圖片
+            LOG.debug("Jump executed!")
+            self.jump_speed = self.jump_velocity
+            self.is_jumping = True  # 立即切換到跳躍圖片
 
     def update(self):
+        self.prev_y = self.y
         if self.is_jumping:
             self.y += self.jump_speed
-            self.jump_speed += 0.8
-            self.image = self.jump_image  # 使用跳躍圖片
+            self.jump_speed += self.gravity
 
-            if self.y >= WINDOW_HEIGHT - 100:
-                self.y = WINDOW_HEIGHT - 100
+            if self.y >= self.ground_y:
+                self.y = self.ground_y
                 self.is_jumping = False
                 self.jump_speed = 0
-                self.image = self.run_frames[0]  # 落地時使用跑步圖片
+                self.animation_frame = 0  # 落地時使用跑步圖片
         else:
             # 更新跑步動畫
             self.animation_frame = (self.animation_frame + self.animation_speed)
-            if self.animation_frame >= len(self.run_frames):
+            if self.animation_frame >= len(DINO_RUN_FRAMES):
                 self.animation_frame = 0
-            self.image = self.run_frames[int(self.animation_frame)]
         
         # 更新距離
         self.distance += self.speed * self.distance_multiplier
@@ -431,65 +792,101 @@ class Dino:
         new_speed = 5 + (self.distance // 100) * self.acceleration
         self.speed = min(new_speed, self.max_speed)
 
-    def draw(self, surface):
-        surface.blit(self.image, (self.x, self.y))
+    def draw(self, surface, alpha=1):
+        # alpha 介於 0 和 1 之間：在上一個 tick 和目前 tick 的位置之間插值
+        y = self.prev_y + (self.y - self.prev_y) * alpha
+        return surface.blit(self.image, (self.x, y))
 
 # 修改 Obstacle 類
 class Obstacle:
+    # 使用 __slots__：障礙物會在 ObstaclePool 中重複使用，不需要每個物件一個 dict
+    __slots__ = ('terrain_type', 'width', 'height', 'x', 'y', 'prev_x')
+    
+    images = {}  # 地形類型 -> 共用的障礙物圖片
+    masks = {}   # 地形類型 -> 共用的碰撞遮罩
+
     def __init__(self, terrain_type='plains'):
+        self.reset(terrain_type)
+    
+    def reset(self, terrain_type):
         self.terrain_type = terrain_type
         
-        # 設置固定的尺寸和高度
-        if terrain_type == 'plains':
-            # 平地：岩石
-            self.width = 40
-            self.height = 40
-            self.y = WINDOW_HEIGHT - 90  # 固定高度
-            self.image = self.create_rock()
-        elif terrain_type == 'mountain':
+        # 設置固定的尺寸和高度（所有障礙物使用相同的位置）
+        if terrain_type == 'mountain':
             # 山地：仙人掌
             self.width = 30
             self.height = 40  # 改為與岩石相同高度
-            self.y = WINDOW_HEIGHT - 90  # 與岩石相同的位置
-            try:
-                self.image = pygame.image.load(os.path.join(IMAGE_ROOT, 'cactus.png'))
-                self.image = pygame.transform.scale(self.image, (self.width, self.height))
-            except pygame.error as e:
-                print(f"Failed to load cactus image: {e}")
-                self.image = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
-                self.image.fill((34, 139, 34))  # 深綠色
-        else:  # forest
-            # 森林：鳥
+        else:
+            # 平地：岩石 / 森林：鳥
             self.width = 40
-            self.height = 40  # 改為與其他障礙物相同高度
-            self.y = WINDOW_HEIGHT - 90  # 與其他障礙物相同的位置
-            try:
-                self.image = pygame.image.load(os.path.join(IMAGE_ROOT, 'bird.png'))
-                self.image = pygame.transform.scale(self.image, (self.width, self.height))
-            except pygame.error as e:
-                print(f"Failed to load bird image: {e}")
-                self.image = self.create_bird()
-            
+            self.height = 40
+        self.y = WINDOW_HEIGHT - 90  # 固定高度
         self.x = WINDOW_WIDTH
+        self.prev_x = self.x  # 上一個 tick 的位置，用於插值繪製
+
+    @property
+    def image(self):
+        # 同一種障礙物共用同一張圖片，生成時不讀取檔案也不重新繪製
+        image = Obstacle.images.get(self.terrain_type)
+        if image is None:
+            image = Obstacle.images[self.terrain_type] = self.load_image()
+        return image
+    
+    @property
+    def mask(self):
+        # 同一種障礙物共用同一個碰撞遮罩
+        mask = Obstacle.masks.get(self.terrain_type)
+        if mask is None:
+            name, create, drawn = self.sprite()
+            mask = Obstacle.masks[self.terrain_type] = ASSETS.mask(name, (self.width, self.height), create, drawn)
+        return mask
+    
+    def sprite(self):
+        # 回傳（圖片名稱, 繪製函式, 是否只用繪製的圖片）
+        if self.terrain_type == 'plains':
+            # 平地：岩石
+            return 'rock', Obstacle.create_rock, True
+        elif self.terrain_type == 'mountain':
+            # 山地：仙人掌
+            return 'cactus', Obstacle.create_cactus, False
+        else:  # forest
+            # 森林：鳥
+            return 'bird', Obstacle.create_bird, False
+    
+    def load_image(self):
+        name, create, drawn = self.sprite()
+        size = (self.width, self.height)
+        if drawn:
+            return ASSETS.get_drawn(name, size, create)
+        return ASSETS.get(name, size, create)
         
-    def create_rock(self):
+    # 改變下面繪製圖片的函式時要把 ATLAS_VERSION 加一
+    @staticmethod
+    def create_cactus(width, height):
+        # 仙人掌圖片載入失敗時的替代圖
+        surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        surface.fill((34, 139, 34))  # 深綠色
+        return surface
+
+    @staticmethod
+    def create_rock(width, height):
         # 創建岩石圖形
-        surface = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
+        surface = pygame.Surface((width, height), pygame.SRCALPHA)
         
         # 主體（深灰色）
         rock_color = (90, 90, 90)  # 更深的灰色
         
         # 更自然的岩石形狀
         points = [
-            (self.width * 0.1, self.height),          # 左下
-            (0, self.height * 0.7),                   # 左凹點
-            (self.width * 0.2, self.height * 0.5),    # 左中突起
-            (self.width * 0.3, self.height * 0.2),    # 左上突起
-            (self.width * 0.5, 0),                    # 頂點
-            (self.width * 0.7, self.height * 0.3),    # 右上突起
-            (self.width * 0.9, self.height * 0.6),    # 右中突起
-            (self.width, self.height * 0.8),          # 右凹點
-            (self.width * 0.9, self.height)           # 右下
+            (width * 0.1, height),          # 左下
+            (0, height * 0.7),              # 左凹點
+            (width * 0.2, height * 0.5),    # 左中突起
+            (width * 0.3, height * 0.2),    # 左上突起
+            (width * 0.5, 0),               # 頂點
+            (width * 0.7, height * 0.3),    # 右上突起
+            (width * 0.9, height * 0.6),    # 右中突起
+            (width, height * 0.8),          # 右凹點
+            (width * 0.9, height)           # 右下
         ]
         pygame.draw.polygon(surface, rock_color, points)
         
@@ -499,150 +896,269 @@ class Obstacle:
         
         # 明面（左上到右下的斜線）
         for i in range(3):
-            start_x = self.width * 0.2 + i * 5
-            start_y = self.height * 0.3 + i * 5
-            end_x = start_x + self.width * 0.3
-            end_y = start_y + self.height * 0.3
+            start_x = width * 0.2 + i * 5
+            start_y = height * 0.3 + i * 5
+            end_x = start_x + width * 0.3
+            end_y = start_y + height * 0.3
             pygame.draw.line(surface, highlight_color, 
                            (start_x, start_y), 
                            (end_x, end_y), 2)
         
         # 暗面（右上到左下的斜線）
         for i in range(2):
-            start_x = self.width * 0.6 + i * 5
-            start_y = self.height * 0.4 + i * 5
-            end_x = start_x - self.width * 0.2
-            end_y = start_y + self.height * 0.3
+            start_x = width * 0.6 + i * 5
+            start_y = height * 0.4 + i * 5
+            end_x = start_x - width * 0.2
+            end_y = start_y + height * 0.3
             pygame.draw.line(surface, shadow_color, 
                            (start_x, start_y), 
                            (end_x, end_y), 2)
         
         return surface
         
-    def create_bird(self):
+    @staticmethod
+    def create_bird(width, height):
         # 創建鳥的圖形
-        surface = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
+        surface = pygame.Surface((width, height), pygame.SRCALPHA)
         
         # 身體（深藍色）
         body_color = (70, 130, 180)
         body_points = [
-            (self.width * 0.3, self.height * 0.5),  # 頭部
-            (self.width * 0.7, self.height * 0.3),  # 上翼
-            (self.width * 0.9, self.height * 0.5),  # 尾部
-            (self.width * 0.7, self.height * 0.7),  # 下翼
+            (width * 0.3, height * 0.5),  # 頭部
+            (width * 0.7, height * 0.3),  # 上翼
+            (width * 0.9, height * 0.5),  # 尾部
+            (width * 0.7, height * 0.7),  # 下翼
         ]
         pygame.draw.polygon(surface, body_color, body_points)
         
         # 頭部（圓形）
-        head_pos = (int(self.width * 0.25), int(self.height * 0.5))
-        pygame.draw.circle(surface, body_color, head_pos, int(self.height * 0.2))
+        head_pos = (int(width * 0.25), int(height * 0.5))
+        pygame.draw.circle(surface, body_color, head_pos, int(height * 0.2))
         
         # 眼睛（白色）
-        eye_pos = (int(self.width * 0.2), int(self.height * 0.45))
+        eye_pos = (int(width * 0.2), int(height * 0.45))
         pygame.draw.circle(surface, WHITE, eye_pos, 2)
         
         # 喙（黃色）
         beak_color = (255, 215, 0)
         beak_points = [
-            (self.width * 0.1, self.height * 0.5),
-            (self.width * 0.25, self.height * 0.45),
-            (self.width * 0.25, self.height * 0.55)
+            (width * 0.1, height * 0.5),
+            (width * 0.25, height * 0.45),
+            (width * 0.25, height * 0.55)
         ]
         pygame.draw.polygon(surface, beak_color, beak_points)
         
         return surface
     
     def update(self, speed):
+        self.prev_x = self.x
         self.x -= speed
 
-    def draw(self, surface):
-        surface.blit(self.image, (self.x, self.y))
+    def draw(self, surface, alpha=1):
+        x = self.prev_x + (self.x - self.prev_x) * alpha
+        return surface.blit(self.image, (x, self.y))
+
+# 障礙物池：使用中的障礙物放在 deque（環狀緩衝區）裡，依 x 由左到右排列
+# 障礙物都從右側生成、以相同速度移動，最先離開畫面的一定在最前面，可以 O(1) 移除
+# 移除的障礙物放回 free 重複使用，遊戲中不會一直建立新物件
+class ObstaclePool:
+    def __init__(self):
+        self.active = deque()
+        self.free = []
+    
+    def spawn(self, terrain_type):
+        if self.free:
+            obstacle = self.free.pop()
+            obstacle.reset(terrain_type)
+        else:
+            obstacle = Obstacle(terrain_type)
+        self.active.append(obstacle)
+        return obstacle
+    
+    def expire(self):
+        # 從最前面移除所有已經離開畫面的障礙物
+        active = self.active
+        while active and active[0].x < -active[0].width:
+            self.free.append(active.popleft())
+    
+    def clear(self):
+        self.free.extend(self.active)
+        self.active.clear()
 
 # 將函數定義移到遊戲主循環外面
 def draw_language_reminder(surface, font_size=36):
-    if FONT_PATH:
-        font = pygame.font.Font(FONT_PATH, font_size)
-    else:
-        font = pygame.font.Font(None, font_size)
+    font = TEXT.font(font_size)
         
 # 在 DinoAI 類中添加繪製狀態的方法
 class DinoAI:
+    status_surface = None  # 狀態欄的半透明背景
+    windows = None         # 障礙物寬度 -> 每個速度的安全起跳距離（最近, 最遠）
+    airtime = 0            # 起跳後經過幾個 tick 落地並可以再跳
+    max_step = 0           # 最高速度的級數
+    steps = {}             # 速度 -> 級數
+
+    # 可以調整的參數（dino_tune.py 會搜尋這些值）
+    lookahead = 3          # 最多往前看幾個障礙物
+    margin = 0             # 安全起跳距離兩端各多留的像素
+    landing_margin = 0     # 落地後再跳時，障礙物至少還要多遠（像素）
+
     def __init__(self, dino):
         self.dino = dino
-        self.base_distance = 90  # 減小基礎跳躍距離
-        self.jump_cooldown = 0
         self.enabled = False
-        self.last_jump_gap = 0   # 記錄上次跳躍時的間距
-        
+        self.plan_key = None  # (最近的障礙物, 障礙物數量, 速度)
+        self.trigger = 0      # 最近的障礙物到這個距離時起跳
+        if DinoAI.windows is None:
+            DinoAI.build_windows()
+
+    @classmethod
+    def configure(cls, lookahead=3, margin=0, landing_margin=0):
+        # 設定可調整的參數並重新建立起跳距離表，之後建立的 DinoAI 都會使用
+        cls.lookahead = lookahead
+        cls.margin = margin
+        cls.landing_margin = landing_margin
+        cls.build_windows()
+    
+    def set_params(self, lookahead=3, margin=0, landing_margin=0):
+        # 只改變這個 AI 的參數（ghost 模式中每隻恐龍的參數不同），不影響其他 DinoAI
+        self.lookahead = lookahead
+        self.margin = margin
+        self.landing_margin = landing_margin
+        self.windows = self.window_table(margin)
+        self.plan_key = None
+
+    @staticmethod
+    def trajectory():
+        # 用真正的 Dino 跳一次，記錄起跳後每個 tick 的高度，和遊戲的物理完全一致
+        dino = Dino()
+        dino.jump()
+        heights = []
+        while True:
+            dino.update()
+            heights.append(dino.y)
+            if not dino.is_jumping:
+                return heights
+
+    @classmethod
+    def build_windows(cls):
+        cls.windows = cls.window_table(cls.margin)
+    
+    @classmethod
+    def window_table(cls, margin):
+        # 預先計算每個速度（5 到 12，每次加 0.2）和障礙物寬度的安全起跳距離
+        # 距離 = 障礙物左邊到恐龍右邊的距離，在決定起跳的 tick 計算
+        heights = cls.trajectory()
+        dino = Dino()
+        cls.airtime = len(heights)
+        cls.max_step = round((dino.max_speed - 5) / dino.acceleration)
+        windows = {}
+        for terrain_type in ('plains', 'mountain', 'forest'):
+            obstacle = Obstacle(terrain_type)
+            # 恐龍底部高於障礙物頂端的 tick（起跳的 tick 為 0）
+            clear = [tick for tick, y in enumerate(heights, 1) if y + dino.height <= obstacle.y]
+            first, last = clear[0], clear[-1]
+            table = []
+            for step in range(cls.max_step + 1):
+                speed = 5 + step * dino.acceleration
+                cls.steps[min(speed, dino.max_speed)] = step
+                faster = min(speed + dino.acceleration, dino.max_speed)  # 跳躍中最多加速一次
+                # 最近：恐龍跳得夠高之前障礙物還沒碰到恐龍
+                nearest = faster * first + margin
+                # 最遠：恐龍落到障礙物的高度之前障礙物已經完全通過
+                farthest = speed * (last + 2) - dino.width - obstacle.width - margin
+                table.append((nearest, farthest))
+            windows[obstacle.width] = table
+        return windows
+
+    def safe_after(self, obstacles, ticks, step):
+        # 等 ticks 個 tick、以第 step 級速度起跳：最近的障礙物要跳得過去，
+        # 後面的障礙物不是在同一跳中通過，就是落地後還來得及再跳
+        dino = self.dino
+        front = dino.x + dino.width
+        speed = 5 + step * dino.acceleration
+        landing = (ticks + self.airtime) * min(speed + dino.acceleration, dino.max_speed)
+        seen = 0
+        for obstacle in obstacles:
+            if obstacle.x + obstacle.width <= dino.x:
+                continue  # 已經通過
+            nearest, farthest = self.windows[obstacle.width][step]
+            distance = obstacle.x - front - ticks * speed
+            if distance < nearest:
+                return False
+            if distance > farthest:
+                return seen > 0 and obstacle.x - front - landing >= nearest + self.landing_margin
+            seen += 1
+            if seen == self.lookahead:
+                break
+        return seen > 0
+
     def should_jump(self, obstacles):
-        if not obstacles or self.dino.is_jumping:
+        dino = self.dino
+        if dino.is_jumping:
+            # 跳躍中會通過障礙物，通過的障礙物會被重複使用，落地後重新規劃
+            self.plan_key = None
             return False
-            
-        nearest_obstacle = obstacles[0]
-        distance = nearest_obstacle.x - (self.dino.x + self.dino.width)
-        
-        # 計算當前速度下的全跳躍距離
-        speed_factor = (self.dino.speed - 5) / 5  # 計算速度加的比例
-        jump_distance = self.base_distance + (self.dino.speed - 5) * 6  # 減小速度補償
-        
-        # 檢查連續障礙物
-        if len(obstacles) > 1:
-            next_obstacle = obstacles[1]
-            gap = next_obstacle.x - nearest_obstacle.x
-            self.last_jump_gap = gap  # 記錄當前間距
-            
-            # 根據度和間距動態調整跳躍時機
-            if gap < 180:  # 非常近的障礙物
-                jump_distance = min(distance + 30, jump_distance)  # 確保不會跳太早
-            elif gap < 250:  # 較近的障礙物
-                jump_distance *= 0.9  # 稍微延後跳躍
-            
-            # 高速時的特殊處理
-            if speed_factor > 0.6:  # 速度超過 8
-                if gap < 200:
-                    jump_distance *= 0.85  # 高速時更晚跳
-                elif gap < 300:
-                    jump_distance *= 0.95
-        
-        # 根據當前速度調整冷卻時間
-        if 0 < distance < jump_distance and self.jump_cooldown <= 0:
-            # 根據間距調整冷卻時間
-            if self.last_jump_gap < 200:
-                self.jump_cooldown = 3  # 連續障礙物時縮短冷卻
-            else:
-                self.jump_cooldown = 4
-            return True
-            
-        if self.jump_cooldown > 0:
-            self.jump_cooldown -= 1
-            
-        return False
+        for obstacle in obstacles:
+            if obstacle.x + obstacle.width > dino.x:
+                break
+        else:
+            return False  # 前面沒有障礙物
+        distance = obstacle.x - dino.x - dino.width
+        # 障礙物都以相同速度移動，只有前面的障礙物或速度改變時才需要重新規劃
+        key = (obstacle, len(obstacles), dino.speed)
+        if key != self.plan_key:
+            self.plan_key = key
+            self.trigger = self.plan(obstacles, obstacle, distance)
+        return distance <= self.trigger
+
+    def plan(self, obstacles, obstacle, distance):
+        # 找出最晚的安全起跳時機（讓同一跳越過越多障礙物），回傳那時最近障礙物的距離
+        # 速度改變時會重新規劃；起跳前的 tick 可能剛好加速，用下一級速度確認不能再等
+        dino = self.dino
+        step = self.steps.get(dino.speed)
+        if step is None:
+            step = min(round((dino.speed - 5) / dino.acceleration), self.max_step)
+        next_step = min(step + 1, self.max_step)
+        speed = 5 + step * dino.acceleration
+        nearest, farthest = self.windows[obstacle.width][step]
+        # 從最近的障礙物的最後機會往前找，通常一兩次就找到
+        last = math.floor((distance - nearest) / speed)
+        first = max(math.ceil((distance - farthest) / speed), 0)
+        for ticks in range(last, first - 1, -1):
+            if (self.safe_after(obstacles, ticks, step) and
+                    not self.safe_after(obstacles, ticks + 1, next_step)):
+                return distance - ticks * speed + 1e-6
+        # 沒有完全安全的時機：至少在最近的障礙物的最後機會起跳
+        return distance - max(last, 0) * speed + 1e-6
     
     def toggle(self):
         self.enabled = not self.enabled
-        print(f"AI auto-jump {'enabled' if self.enabled else 'disabled'}")
+        LOG.info("AI auto-jump %s", 'enabled' if self.enabled else 'disabled')
     
     def update(self, obstacles):
         if self.enabled and self.should_jump(obstacles):  # 只在啟用時執行
             self.dino.jump()
     
-    def draw_status(self, surface, font):
-        # 創建半透明背景
-        status_surface = pygame.Surface((150, 40))
-        status_surface.fill(WHITE)
-        status_surface.set_alpha(180)
+    def draw_status(self, surface, font_size=36, panel=True):
+        # panel 為 False 時（降低畫質）不畫半透明背景，省下一次 alpha blit
+        # 創建半透明背景（所有 AI 共用同一個背景，只建立一次）
+        if DinoAI.status_surface is None:
+            DinoAI.status_surface = pygame.Surface((150, 40))
+            DinoAI.status_surface.fill(WHITE)
+            DinoAI.status_surface.set_alpha(180)
         
         # 設置位置（右上角）
         x = WINDOW_WIDTH - 160
         y = 10
         
         # 繪製背景
-        surface.blit(status_surface, (x, y))
+        if panel:
+            surface.blit(DinoAI.status_surface, (x, y))
         
         # 繪製文字
-        status_text = font.render(f"AI: {'ON' if self.enabled else 'OFF'}", True, 
-                                (34, 139, 34) if self.enabled else (139, 34, 34))
+        status_text = TEXT.render(f"AI: {'ON' if self.enabled else 'OFF'}", font_size,
+                                  (34, 139, 34) if self.enabled else (139, 34, 34))
         surface.blit(status_text, (x + 10, y + 5))
+        return pygame.Rect(x, y, 150, 40)
 
 # 在主遊戲循環外添加變量來追踪連續障礙物
 class ObstacleManager:
@@ -651,22 +1167,22 @@ class ObstacleManager:
         self.last_obstacle_x = 0    # 記錄上一個障礙物的位置
         self.base_gap = 400         # 基礎間距從300增加到400
     
-    def should_spawn(self, obstacles, window_width, speed):
+    def should_spawn(self, last_x, window_width, speed):
+        # last_x：最右邊（最後生成）的障礙物的 x，沒有障礙物時是 None
         # 根據速度調整最小間距（每增加1速度，增加15間距）
         min_gap = self.base_gap + (speed - 5) * 15  # 速度補償係數從10增加到15
         
         # 如果沒有障礙物，可以生成
-        if not obstacles:
+        if last_x is None:
             self.consecutive_count = 0
             return True
         
         # 檢查是否有足夠空間生成新障礙物
-        last_obstacle = obstacles[-1]
-        if last_obstacle.x >= window_width - min_gap:
+        if last_x >= window_width - min_gap:
             return False
             
         # 檢查與上一個障礙物的間距
-        gap = last_obstacle.x - self.last_obstacle_x
+        gap = last_x - self.last_obstacle_x
         if gap < min_gap * 0.7:  # 連續障礙物判定閾值從0.67增加到0.7
             self.consecutive_count += 1
         else:
@@ -677,140 +1193,962 @@ class ObstacleManager:
             return False
             
         # 更新上一個障礙物的位置
-        self.last_obstacle_x = last_obstacle.x
+        self.last_obstacle_x = last_x
         return True
     
     def reset(self):
         self.consecutive_count = 0
         self.last_obstacle_x = 0
 
-# 在主遊戲開始前初始化
-obstacle_manager = ObstacleManager()
 
-# 遊戲主要物件
-dino = Dino()
-dino_ai = DinoAI(dino)  # 創建 AI 控制器
-obstacles = []
-clock = pygame.time.Clock()
-score = 0
-game_over = False
+def load_collision_masks():
+    # 遊戲開始前先建立所有碰撞遮罩，遊戲中不會再建立
+    dino = Dino()
+    size = (dino.width, dino.height)
+    for name in DINO_RUN_FRAMES + ('dino_jump',):
+        ASSETS.mask(name, size)
+    obstacle = Obstacle('plains')
+    for terrain_type in ('plains', 'mountain', 'forest'):
+        obstacle.reset(terrain_type)
+        obstacle.mask
 
-# 在遊戲主循環中添加計時器來顯示示（前 5 秒
-start_time = pygame.time.get_ticks()
-REMINDER_DURATION = 5000  # 5秒
 
-# 修改主遊戲循環的開始部分
-if not show_start_screen():
-    running = False
-else:
-    running = True
-    # 重置開始時間（這樣輸入提示才會從遊戲實際開始時計時）
-    start_time = pygame.time.get_ticks()
-
-# 添加背景
-background = Background()
-
-# 遊戲主循環
-while running:
-    # 事件處理
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-        elif event.type == pygame.KEYDOWN:
-            key_name = pygame.key.name(event.key)
-            unicode_char = event.unicode.lower()
-            print(f"Key pressed: {key_name}")
-            print(f"Key code: {event.key}")
-            print(f"Key unicode: {unicode_char}")
-            print(f"Key modifiers: {pygame.key.get_mods()}")
-            
-            # 轉換按鍵名為小寫並���除空格，以理全形半形差異
-            key_name = key_name.lower().strip()
-            
-            # 跳躍鍵檢測：支持多種輸入式
-            jump_chars = {'w', 'ｗ','ㄊ','space'}  # 空格鍵用 ' ' 表示
-            
-            if event.key == pygame.K_ESCAPE or unicode_char == 'esc':
-                running = False
-            elif (event.key in [pygame.K_SPACE, pygame.K_UP, pygame.K_w] or 
-                  unicode_char in jump_chars or 
-                  key_name in ['space', 'up', 'w']):
-                print("Jump detected!")
-                dino.jump()
-            elif ((event.key == pygame.K_r or 
-                   unicode_char in {'r', 'ｒ'}) and 
-                  game_over):
-                dino = Dino()
-                dino_ai = DinoAI(dino)  # 重新創建 AI
-                dino_ai.enabled = True  # 如果之前開了 AI，保持開啟
-                obstacles = []
-                score = 0
-                game_over = False
-                
-                # 重置背景和地形
-                background = Background()  # 創建新的背景實例
-                background.terrain_type = 'plains'  # 重置為初始地形
-                background.next_change = 100  # 重置下一次改變的距離
-                background.generate_terrain()  # 重新生成地形元素
-                obstacle_manager.reset()
-            elif event.key == pygame.K_h:  # 用 H 鍵切換 AI
-                dino_ai.toggle()
+def game_sprites():
+    # 遊戲用到的所有圖片：(圖片名稱, 尺寸, 繪製函式, 是否只用繪製的圖片)，圖集依這個清單產生
+    dino = Dino()
+    size = (dino.width, dino.height)
+    sprites = [(name, size, None, False) for name in DINO_RUN_FRAMES + ('dino_jump',)]
+    obstacle = Obstacle('plains')
+    for terrain_type in ('plains', 'mountain', 'forest'):
+        obstacle.reset(terrain_type)
+        name, create, drawn = obstacle.sprite()
+        sprites.append((name, (obstacle.width, obstacle.height), create, drawn))
+    return sprites
+
+
+def atlas_sources():
+    # 圖集的來源：用到的 PNG
+    return [os.path.join(IMAGE_ROOT, f'{name}.png')
+            for name, _, _, drawn in game_sprites() if not drawn]
+
+
+def atlas_recipe():
+    # 除了 PNG 之外決定圖集像素的東西：ATLAS_VERSION（繪製的程式碼）和每張圖片的名稱、尺寸。
+    # 只改遊戲其他部分的程式碼不會讓圖集過期
+    table = [(name, size, drawn) for name, size, _, drawn in game_sprites()]
+    return repr((ATLAS_VERSION, table)).encode()
+
+
+# 可以生成障礙物時，每個 tick 生成的機率
+OBSTACLE_SPAWN_CHANCE = 0.02
+
+MASK64 = (1 << 64) - 1
+
+
+class SplitMix64:
+    # 障礙物生成用的亂數產生器：狀態只有一個整數，快照和還原幾乎不花時間
+    # dino_batch.BatchEnv 用同樣的演算法，種子相同時產生同樣的亂數
+    def __init__(self, seed):
+        self.state = seed & MASK64
+    
+    def random(self):
+        self.state = state = (self.state + 0x9E3779B97F4A7C15) & MASK64
+        z = ((state ^ (state >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+        return ((z ^ (z >> 31)) >> 11) * (1.0 / (1 << 53))
+
+# 障礙物路線：恐龍的速度只和距離有關，不管怎麼跳，每個 tick 的速度、障礙物的位置和地形都一樣，
+# 所以整條路線可以用種子事先算出來。路線依距離分段產生（每段 chunk 公尺），遊戲前進到還沒產生
+# 的地方才產生下一段。生成規則（ObstacleManager 的最小間距、最多連續兩個）和亂數的使用順序都和
+# 每個 tick 判斷時相同，同樣的種子和設定會得到同樣的遊戲
+class ObstacleCourse:
+    def __init__(self, seed, base_gap=400, spawn_chance=OBSTACLE_SPAWN_CHANCE, chunk=5,
+                 tick=0, distance=0, speed=5, terrain_type='plains', next_change=100):
+        # tick 以後的狀態：恐龍的距離和速度、目前的地形和下一次改變的距離
+        self.seed = seed
+        self.base_gap = base_gap
+        self.spawn_chance = spawn_chance
+        self.chunk = chunk
+        # 產生的結果，依 tick 排序：
+        #   spawns：每個障礙物的 (生成的 tick, 恐龍的距離, 種類)，障礙物在那個 tick 從畫面右側出現
+        #   terrain：每次地形改變的 (tick, 恐龍的距離, 新地形)，在那個 tick 的最後改變
+        self.spawns = []
+        self.terrain = []
+        self.end_tick = tick  # 已經產生到這個 tick（不含）
+        
+        # 產生器的狀態：和遊戲相同的速度、障礙物和地形，只是沒有恐龍的跳躍和碰撞；
+        # 障礙物只需要位置（依 x 排序）和寬度，用 float 的 list 保存
+        self.rng = SplitMix64(seed)
+        self.manager = ObstacleManager()
+        self.manager.base_gap = base_gap
+        self.xs = []
+        self.widths = []
+        self.distance = distance
+        self.speed = speed
+        self.terrain_type = terrain_type
+        self.next_change = next_change
+        dino = Dino()
+        self.dino_constants = (dino.distance_multiplier, dino.acceleration, dino.max_speed)
+        self.obstacle_widths = {}
+        obstacle = Obstacle()
+        for name in ('plains', 'mountain', 'forest'):
+            obstacle.reset(name)
+            self.obstacle_widths[name] = obstacle.width
+    
+    @classmethod
+    def for_state(cls, state):
+        # 依照 GameState 目前的設定和狀態產生路線（工具在建立 GameState 後才調整設定）
+        dino = state.dino
+        background = state.background
+        return cls(state.seed, state.obstacle_manager.base_gap, state.spawn_chance,
+                   tick=state.ticks, distance=dino.distance, speed=dino.speed,
+                   terrain_type=background.terrain_type, next_change=background.next_change)
     
+    def generate(self):
+        # 產生下一段路線；速度、障礙物的移動和生成的判斷和 Dino.update、Obstacle.update、
+        # GameState.step 的計算完全相同，浮點數的結果也一樣
+        multiplier, acceleration, max_speed = self.dino_constants
+        should_spawn = self.manager.should_spawn
+        rng = self.rng
+        spawn_chance = self.spawn_chance
+        xs = self.xs
+        widths = self.widths
+        spawns = self.spawns
+        distance = self.distance
+        speed = self.speed
+        terrain_type = self.terrain_type
+        width = self.obstacle_widths[terrain_type]
+        next_change = self.next_change
+        tick = self.end_tick
+        end = distance + self.chunk
+        while distance < end:
+            distance += speed * multiplier
+            speed = 5 + (distance // 100) * acceleration
+            if speed > max_speed:
+                speed = max_speed
+            if should_spawn(xs[-1] if xs else None, WINDOW_WIDTH, speed):
+                if rng.random() < spawn_chance:
+                    xs.append(WINDOW_WIDTH)
+                    widths.append(width)
+                    spawns.append((tick, distance, terrain_type))
+            if xs:
+                xs[:] = [x - speed for x in xs]
+                # 和 ObstaclePool.expire 相同：從最前面移除離開畫面的障礙物
+                while xs and xs[0] < -widths[0]:
+                    del xs[0]
+                    del widths[0]
+            if distance >= next_change:
+                terrain_type = next_terrain(terrain_type)
+                width = self.obstacle_widths[terrain_type]
+                next_change += 100
+                self.terrain.append((tick, distance, terrain_type))
+            tick += 1
+        self.distance = distance
+        self.speed = speed
+        self.terrain_type = terrain_type
+        self.next_change = next_change
+        self.end_tick = tick
+    
+    def next_tick(self, events, index):
+        # events 是 spawns 或 terrain：回傳第 index 個的 tick，還沒產生到就先產生下一段；
+        # 那一段裡也沒有時回傳已經產生到的 tick，遊戲到那裡再查一次
+        if index >= len(events):
+            self.generate()
+            if index >= len(events):
+                return self.end_tick
+        return events[index][0]
+    
+    def between(self, start, end):
+        # 在 start 到 end（不含）之間的 tick 生成的障礙物，需要時先產生路線
+        while self.end_tick < end:
+            self.generate()
+        return self.spawns[bisect_left(self.spawns, (start,)):bisect_left(self.spawns, (end,))]
 
-    if not game_over:
+# 無頭遊戲狀態：只保存模擬需要的物件，不需要視窗、字體或圖片
+class GameState:
+    def __init__(self, seed=None, scenery=True):
+        # scenery 為 False 時不更新背景景物，只改變地形類型（不影響結果，模擬較快）
+        self.scenery = scenery
+        # 生成障礙物的設定（base_gap），實際的判斷在 ObstacleCourse 裡
+        self.obstacle_manager = ObstacleManager()
+        self.obstacle_pool = ObstaclePool()
+        self.obstacles = self.obstacle_pool.active  # 依 x 排序的使用中障礙物
+        self.pixel_collisions = True  # False 時只用外框判斷碰撞
+        self.collisions = True        # False 時恐龍不會撞到障礙物（ghost 模式只用來產生世界）
+        self.profiler = None  # 設定 FrameProfiler 時記錄每個階段的時間
+        load_collision_masks()
+        self.reset(seed)
+    
+    def reset(self, seed=None):
+        # 每局使用自己的亂數種子，沒有指定時隨機選一個，記錄下來就能重現這一局
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        self.seed = seed
+        
+        self.dino = Dino()
+        self.dino_ai = DinoAI(self.dino)
+        self.obstacle_pool.clear()
+        self.background = Background(random.Random(seed))
+        self.spawn_chance = OBSTACLE_SPAWN_CHANCE
+        self.game_over = False
+        self.killed_by = None  # 結束這一局的障礙物（rock、cactus、bird）
+        self.ticks = 0
+        # 障礙物路線在第一個 tick 才產生，建立後調整的設定也會用到；
+        # 之後只記錄下一個障礙物和下一次地形改變的位置
+        self.course = None
+        self.spawn_index = 0
+        self.next_spawn = 0
+        self.terrain_index = 0
+        self.next_terrain = 0
+    
+    def obstacle_course(self):
+        if self.course is None:
+            self.course = ObstacleCourse.for_state(self)
+        return self.course
+    
+    def upcoming_obstacles(self, ticks):
+        # 接下來 ticks 個 tick 會生成的障礙物 (tick, 距離, 種類)，給 AI 規劃使用
+        return self.obstacle_course().between(self.ticks, self.ticks + ticks)
+    
+    def step(self, jump=False, toggle_ai=False):
+        # 前進一個 tick，回傳遊戲是否結束
+        if self.game_over:
+            return True
+        
+        dino = self.dino
+        profiler = self.profiler
+        if self.course is None:
+            self.obstacle_course()  # 第一個 tick 依照目前的設定產生路線
+        if toggle_ai:
+            self.dino_ai.toggle()
+        if jump:
+            dino.jump()
+        
         # 更新遊戲狀態
         dino.update()
-        dino_ai.update(obstacles)
+        if profiler:
+            profiler.mark('dino_update')
+        self.dino_ai.update(self.obstacles)
+        if profiler:
+            profiler.mark('ai_update')
+        
+        # 生成障礙物：路線已經算好，只有到了下一個障礙物的 tick 才需要處理
+        if self.ticks == self.next_spawn:
+            self.spawn_obstacle()
+        if profiler:
+            profiler.mark('spawn')
         
-        # 生成障礙物，傳入當前速度
-        if obstacle_manager.should_spawn(obstacles, WINDOW_WIDTH, dino.speed):
-            if random.random() < 0.02:
-                obstacles.append(Obstacle(background.terrain_type))
-
         # 更新障礙物
-        for obstacle in obstacles[:]:
+        for obstacle in self.obstacles:
             obstacle.update(dino.speed)  # 使用恐龍的速度
-            # 碰撞檢測
-            if (dino.x < obstacle.x + obstacle.width and
-                dino.x + dino.width > obstacle.x and
-                dino.y < obstacle.y + obstacle.height and
-                dino.y + dino.height > obstacle.y):
-                game_over = True
+        
+        # 碰撞檢測
+        obstacle = self.collides() if self.collisions else None
+        if obstacle:
+            self.game_over = True
+            self.killed_by = obstacle.sprite()[0]
+        
+        # 移除超出畫面的障礙物
+        self.obstacle_pool.expire()
+        if profiler:
+            profiler.mark('obstacles')
+        
+        # 更新背景
+        if self.ticks == self.next_terrain:
+            self.change_terrain()
+        if self.scenery:
+            self.background.update(dino.speed)
+        if profiler:
+            profiler.mark('background_update')
+        
+        self.ticks += 1
+        return self.game_over
+    
+    def spawn_obstacle(self):
+        course = self.obstacle_course()
+        if course.next_tick(course.spawns, self.spawn_index) == self.ticks:
+            self.obstacle_pool.spawn(course.spawns[self.spawn_index][2])
+            self.spawn_index += 1
+        self.next_spawn = course.next_tick(course.spawns, self.spawn_index)
+    
+    def change_terrain(self):
+        course = self.obstacle_course()
+        if course.next_tick(course.terrain, self.terrain_index) == self.ticks:
+            if self.scenery:
+                self.background.change_terrain()
+            else:
+                self.background.advance_terrain()
+            self.terrain_index += 1
+        self.next_terrain = course.next_tick(course.terrain, self.terrain_index)
+    
+    def snapshot(self):
+        # 影響結果的所有狀態，只用 tuple 保存（不包含 Surface 和景物），用 restore() 還原
+        # 路線只會往後產生、不會改變，快照只保存參照和讀到的位置
+        dino = self.dino
+        background = self.background
+        return (
+            self.ticks, self.game_over,
+            (dino.y, dino.prev_y, dino.jump_speed, dino.is_jumping, dino.distance, dino.speed,
+             dino.animation_frame),
+            self.dino_ai.enabled,
+            tuple([(o.terrain_type, o.x, o.prev_x) for o in self.obstacles]),
+            self.obstacle_course(), self.spawn_index, self.next_spawn, self.terrain_index,
+            self.next_terrain,
+            background.terrain_type, background.next_change, self.killed_by,
+        )
+    
+    def restore(self, snapshot):
+        # 還原 snapshot() 的狀態；障礙物從物件池重複使用，不建立新物件
+        dino = self.dino
+        background = self.background
+        (self.ticks, self.game_over, dino_values, self.dino_ai.enabled, obstacles,
+         self.course, self.spawn_index, self.next_spawn, self.terrain_index, self.next_terrain,
+         terrain_type, background.next_change, self.killed_by) = snapshot
+        (dino.y, dino.prev_y, dino.jump_speed, dino.is_jumping, dino.distance, dino.speed,
+         dino.animation_frame) = dino_values
+        self.dino_ai.plan_key = None  # 障礙物物件已經不同，AI 重新規劃
+        if terrain_type != background.terrain_type:
+            background.terrain_type = terrain_type
+            if self.scenery:
+                background.generate_terrain()
+        
+        pool = self.obstacle_pool
+        pool.clear()
+        for terrain_type, x, prev_x in obstacles:
+            obstacle = pool.spawn(terrain_type)
+            obstacle.x = x
+            obstacle.prev_x = prev_x
+    
+    def collides(self):
+        # 回傳撞到的障礙物，沒有撞到時回傳 None
+        # 粗略階段：障礙物依 x 排序，只檢查和恐龍 x 範圍重疊的障礙物
+        dino = self.dino
+        dino_right = dino.x + dino.width
+        for obstacle in self.obstacles:
+            if obstacle.x >= dino_right:
+                break  # 後面的障礙物都在更右邊
+            if obstacle.x + obstacle.width <= dino.x:
+                continue
+            if dino.y < obstacle.y + obstacle.height and dino.y + dino.height > obstacle.y:
+                # 精確階段：比對預先建立的遮罩，透明的角落不算碰到
+                if not self.pixel_collisions:
+                    return obstacle
+                offset = (int(obstacle.x) - int(dino.x), int(obstacle.y) - int(dino.y))
+                if dino.mask.overlap(obstacle.mask, offset):
+                    return obstacle
+        return None
+    
+    def state_hash(self):
+        # 所有影響結果的狀態的雜湊值，用於確認重播結果一致
+        dino = self.dino
+        background = self.background
+        values = (
+            self.ticks, self.game_over,
+            dino.y, dino.jump_speed, dino.is_jumping, dino.distance, dino.speed, dino.animation_frame,
+            self.dino_ai.enabled,
+            tuple((o.terrain_type, o.x) for o in self.obstacles),
+            self.spawn_index, self.terrain_index,
+            background.terrain_type, background.next_change,
+        )
+        return hashlib.blake2b(repr(values).encode(), digest_size=8).hexdigest()
 
-            # 移除超出畫面的障礙物
-            if obstacle.x < -obstacle.width:
-                obstacles.remove(obstacle)
+# 不開視窗、不限制幀率地執行一局，回傳結束時的狀態
+def run_headless(max_ticks=100000, ai_enabled=True, seed=None):
+    state = GameState(seed, scenery=False)
+    state.dino_ai.enabled = ai_enabled
+    while state.ticks < max_ticks and not state.step():
+        pass
+    return state
 
-        # 更新背景
-        background.update(dino.speed, dino.distance)  # 添加 dino.distance 參數
-
-    # 繪製畫面
-    window.fill(WHITE)
-    background.draw(window)
-    dino.draw(window)
-    for obstacle in obstacles:
-        obstacle.draw(window)
-
-    # 顯示分數（使用距離）
-    if FONT_PATH:
-        font = pygame.font.Font(FONT_PATH, 36)
-    else:
-        font = pygame.font.Font(None, 36)
-    score_text = font.render(f'Distance: {int(dino.distance)}m', True, BLACK)
-    window.blit(score_text, (10, 10))
+# 視窗繪製：只讀取 GameState，不改變遊戲狀態
+# 畫質等級由低到高，QualityController 在畫面太慢時往下調：
+#   clouds：是否畫雲
+#   status_panel：AI 狀態欄是否畫半透明背景
+#   terrain_detail：畫出的地形元素比例（減少地形改變時重建圖層的時間）
+#   background_interval：背景每幾幀重畫一次，其他幀只重畫恐龍、障礙物和 HUD（和 --dirty-rects 相同的方式）
+QUALITY_LEVELS = (
+    {'name': 'low', 'clouds': False, 'status_panel': False, 'terrain_detail': 0.5, 'background_interval': 4},
+    {'name': 'medium', 'clouds': False, 'status_panel': False, 'terrain_detail': 0.5, 'background_interval': 1},
+    {'name': 'high', 'clouds': True, 'status_panel': False, 'terrain_detail': 1.0, 'background_interval': 1},
+    {'name': 'full', 'clouds': True, 'status_panel': True, 'terrain_detail': 1.0, 'background_interval': 1},
+)
+QUALITY_NAMES = [quality['name'] for quality in QUALITY_LEVELS]
 
-    # 顯示 AI 狀態
-    dino_ai.draw_status(window, font)
+class GameRenderer:
+    def __init__(self, surface, dirty_rects=False, display=None):
+        # display：Display 時由它輸出到視窗（可能需要縮放），否則直接 flip
+        self.surface = surface
+        self.display = display
+        self.parallax = ParallaxBackground()
+        self.profiler = None  # 設定 FrameProfiler 時記錄每個階段的時間
+        
+        # 髒矩形模式：背景只在地形改變時重畫，每幀只更新有變化的區域
+        self.dirty_rects = dirty_rects
+        self.static_background = None
+        self.background_key = None
+        self.sprite_rects = []  # 上一幀恐龍和障礙物的位置
+        self.hud_key = None     # 上一幀 HUD 的內容
+        self.hud_rects = []
+        self.update_rects = None  # None 表示需要更新整個視窗
+        self.background_age = 0   # 背景上次重畫後經過的幀數
+        self.quality = QUALITY_LEVELS[-1]
+    
+    def set_quality(self, level):
+        self.quality = QUALITY_LEVELS[level]
+        self.parallax.set_quality(self.quality['clouds'], self.quality['terrain_detail'])
+        self.background_key = None  # 下一幀重畫整個畫面
+    
+    def draw(self, state, alpha=1):
+        # alpha：距離上一個 tick 經過的比例，用於插值位置
+        interval = self.quality['background_interval']
+        if self.dirty_rects or interval > 1:
+            self.draw_dirty(state, alpha, None if self.dirty_rects else interval)
+            return
+        
+        surface = self.surface
+        profiler = self.profiler
+        
+        # 繪製畫面（背景使用預先繪製的視差圖層）
+        self.parallax.draw(surface, state.background, alpha)
+        if profiler:
+            profiler.mark('background_draw')
+        state.dino.draw(surface, alpha)
+        for obstacle in state.obstacles:
+            obstacle.draw(surface, alpha)
+        if profiler:
+            profiler.mark('sprites')
+        
+        self.draw_hud(state)
+        if profiler:
+            profiler.mark('hud')
+        self.update_rects = None
+        self.sprite_rects = []  # 整個畫面都重畫了，不需要蓋掉上一幀的任何區域
+    
+    def draw_hud(self, state):
+        surface = self.surface
+        
+        # 顯示分數（使用距離）
+        rects = [TEXT.blit_number(surface, (10, 10), 'Distance: ', int(state.dino.distance), 'm', 36, BLACK)]
+        
+        # 顯示 AI 狀態
+        rects.append(state.dino_ai.draw_status(surface, panel=self.quality['status_panel']))
+        
+        if state.game_over:
+            game_over_text = TEXT.render('Game Stop! Press R to restart', 36, BLACK)
+            rects.append(surface.blit(game_over_text, (WINDOW_WIDTH//2 - 150, WINDOW_HEIGHT//2)))
+        return rects
+    
+    def draw_dirty(self, state, alpha=1, interval=None):
+        # interval：每幾幀重畫一次捲動的背景；None 表示背景只在地形改變時重畫
+        surface = self.surface
+        profiler = self.profiler
+        background = state.background
+        
+        # 新背景或地形改變時重畫整個畫面
+        key = (id(background), background.version)
+        self.background_age += 1
+        full = key != self.background_key or (interval is not None and self.background_age >= interval)
+        if full:
+            if self.static_background is None:
+                self.static_background = pygame.Surface(surface.get_size()).convert()
+            self.parallax.draw(self.static_background, background, alpha)
+            surface.blit(self.static_background, (0, 0))
+            self.background_key = key
+            self.background_age = 0
+            self.hud_key = None
+        else:
+            # 用靜態背景蓋掉上一幀的恐龍和障礙物
+            for rect in self.sprite_rects:
+                surface.blit(self.static_background, rect, rect)
+        if profiler:
+            profiler.mark('background_draw')
+        
+        dirty = self.sprite_rects
+        self.sprite_rects = [state.dino.draw(surface, alpha)]
+        for obstacle in state.obstacles:
+            self.sprite_rects.append(obstacle.draw(surface, alpha))
+        dirty = dirty + self.sprite_rects
+        if profiler:
+            profiler.mark('sprites')
+        
+        # HUD 只在內容改變時重畫
+        hud_key = (int(state.dino.distance), state.dino_ai.enabled, state.game_over)
+        if hud_key != self.hud_key:
+            for rect in self.hud_rects:
+                surface.blit(self.static_background, rect, rect)
+            dirty.extend(self.hud_rects)
+            self.hud_rects = self.draw_hud(state)
+            dirty.extend(self.hud_rects)
+            self.hud_key = hud_key
+        if profiler:
+            profiler.mark('hud')
+        
+        self.update_rects = None if full else dirty
+    
+    def add_overlay(self, rect):
+        # 畫在遊戲畫面上方的額外內容（例如效能分析）。只更新部分區域的幀（--dirty-rects，
+        # 或低畫質時沒有重畫背景的幀）要把它加進更新的區域，下一個這樣的幀會用背景蓋掉
+        self.sprite_rects.append(rect)
+        if self.update_rects is not None:
+            self.update_rects.append(rect)
+    
+    def present(self):
+        # 整個視窗 flip，或在髒矩形模式下只更新有變化的區域
+        if self.display is not None:
+            self.display.present(self.update_rects)
+        elif self.update_rects is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(self.update_rects)
+        if self.profiler:
+            self.profiler.mark('flip')
+
+# 輸出到視窗的方式：遊戲永遠畫在 WINDOW_WIDTH x WINDOW_HEIGHT 的畫面上，所有座標都以它為準
+#   none：視窗就是遊戲畫面的大小（原本的方式）
+#   sdl：pygame.SCALED，由 SDL（有 GPU 時用 GPU）把畫面縮放到視窗並保持比例，視窗可以調整大小
+#   software：遊戲畫在記憶體中的 Surface，每幀用一次 pygame.transform.scale 直接縮放到
+#             視窗中保持比例的區域（其餘留黑邊），視窗大小改變時才重新計算這個區域
+SCALE_MODES = ('none', 'sdl', 'software')
+
+class Display:
+    def __init__(self, caption, scale='none', fullscreen=False, size=None):
+        # size：software 模式的視窗大小，預設和遊戲畫面相同；全螢幕時使用桌面的解析度
+        if fullscreen and scale == 'none':
+            scale = 'sdl'
+        self.scale = scale
+        init_display()
+        game_size = (WINDOW_WIDTH, WINDOW_HEIGHT)
+        flags = pygame.FULLSCREEN if fullscreen else pygame.RESIZABLE
+        if scale == 'sdl':
+            window = pygame.display.set_mode(game_size, flags | pygame.SCALED)
+        elif scale == 'software':
+            window = pygame.display.set_mode((0, 0) if fullscreen else size or game_size, flags)
+        else:
+            window = pygame.display.set_mode(game_size)
+        pygame.display.set_caption(caption)
+        # surface：遊戲繪製的畫面；software 模式使用和視窗相同的像素格式，縮放時不用轉換
+        self.surface = pygame.Surface(game_size).convert() if scale == 'software' else window
+        self.output_size = None
+        self.target = None  # 視窗中顯示遊戲畫面的區域（視窗的 subsurface）
+    
+    def resize(self, window):
+        # 依照視窗大小重新計算顯示區域，黑邊只在這時填一次
+        self.output_size = window.get_size()
+        width, height = self.output_size
+        ratio = min(width / WINDOW_WIDTH, height / WINDOW_HEIGHT)
+        rect = pygame.Rect(0, 0, int(WINDOW_WIDTH * ratio), int(WINDOW_HEIGHT * ratio))
+        rect.center = (width // 2, height // 2)
+        window.fill(BLACK)
+        self.target = window.subsurface(rect) if rect.width and rect.height else None
+        LOG.info("Display output %dx%d, game area %dx%d", width, height, rect.width, rect.height)
+    
+    def present(self, rects=None):
+        # rects：只更新這些區域（遊戲畫面的座標）；縮放時一律更新整個視窗
+        if self.scale != 'software':
+            if rects is None:
+                pygame.display.flip()
+            else:
+                pygame.display.update(rects)
+            return
+        window = pygame.display.get_surface()
+        if window.get_size() != self.output_size:
+            self.resize(window)
+        if self.target is not None:
+            pygame.transform.scale(self.surface, self.target.get_size(), self.target)
+        pygame.display.flip()
+
+REMINDER_DURATION = 5000  # 5秒
+
+# 固定時間步長：模擬永遠以 SIMULATION_HZ 前進，與畫面更新率無關
+SIMULATION_HZ = 60
+MAX_CATCHUP_STEPS = 5  # 一幀最多補跑的 tick 數，避免越追越慢
+
+class FixedStepLoop:
+    def __init__(self, tick_rate=SIMULATION_HZ, max_steps=MAX_CATCHUP_STEPS):
+        self.step_time = 1.0 / tick_rate
+        self.max_steps = max_steps
+        self.accumulator = 0.0
+        self.last_time = None
+        self.dropped_steps = 0  # 因為超過補跑上限而放棄的 tick 數
+    
+    def reset(self):
+        self.accumulator = 0.0
+        self.last_time = None
+    
+    def advance(self, urgent=False):
+        # 回傳這一幀應該執行的 tick 數
+        # urgent：有還沒套用的跳躍。這一幀還不到下一個 tick 時提早執行一個，
+        # 從之後的時間扣回來（最多領先一個 tick），按鍵在這一幀就會顯示
+        now = time.perf_counter()
+        if self.last_time is not None:
+            self.accumulator += now - self.last_time
+        self.last_time = now
+        
+        steps = int(self.accumulator / self.step_time)
+        self.accumulator -= steps * self.step_time
+        if steps > self.max_steps:
+            self.dropped_steps += steps - self.max_steps
+            steps = self.max_steps
+        if urgent and steps == 0 and self.accumulator >= 0:
+            self.accumulator -= self.step_time
+            steps = 1
+        return steps
+    
+    @property
+    def alpha(self):
+        # 剩餘時間佔一個 tick 的比例，用於插值繪製（提早執行 tick 後為 0）
+        return min(max(self.accumulator / self.step_time, 0.0), 1.0)
 
-    if game_over:
-        game_over_text = font.render('Game Stop! Press R to restart', True, BLACK)
-        window.blit(game_over_text, (WINDOW_WIDTH//2 - 150, WINDOW_HEIGHT//2))
+class StartupTimer:
+    # 記錄啟動各階段（import、初始化、讀取圖片、第一幀）花的時間
+    def __init__(self, start):
+        self.last = start
+        self.phases = []  # (階段, 秒)
+    
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, now - self.last))
+        self.last = now
+    
+    def skip(self):
+        # 不計算到目前為止的時間（例如在開始畫面等玩家按鍵）
+        self.last = time.perf_counter()
+    
+    def report(self):
+        lines = [f"Startup {name}: {seconds * 1000:.1f}ms" for name, seconds in self.phases]
+        lines.append(f"Startup total: {sum(seconds for _, seconds in self.phases) * 1000:.1f}ms")
+        return lines
 
-    # 顯示輸入法提示（僅在開始的5秒內）
-    if pygame.time.get_ticks() - start_time < REMINDER_DURATION:
-        draw_language_reminder(window, 36)
+STARTUP = StartupTimer(_IMPORT_START)
 
-    pygame.display.flip()
-    clock.tick(60)
+def measure_startup(render=True):
+    # 不經過開始畫面，依序執行 main() 的啟動階段並回傳 [(階段, 秒)]，給 dino_bench.py 在新的行程中呼叫
+    if render:
+        init_display()
+        window = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+        STARTUP.mark('init')
+    state = GameState(0, scenery=render)
+    if render:
+        renderer = GameRenderer(window)
+    STARTUP.mark('assets')
+    state.step()
+    if render:
+        renderer.draw(state)
+        renderer.present()
+    STARTUP.mark('first frame')
+    return STARTUP.phases
 
-pygame.quit() 
\ No newline at end of file
+class QualityController:
+    # 依最近的幀時間（不含等待下一幀的時間）調整畫質，用遲滯避免來回切換：
+    # 平均超過預算的 down_ratio 就降一級；低於 up_ratio 持續 up_frames 幀才升一級。
+    # 升級後很快又降級表示那個等級撐不住，之後要等兩倍久才會再試
+    def __init__(self, budget_ms=1000 / SIMULATION_HZ, window=30, down_ratio=0.9, up_ratio=0.5,
+                 up_frames=180, max_up_frames=3600):
+        self.samples = deque(maxlen=window)
+        self.down_ms = budget_ms * down_ratio
+        self.up_ms = budget_ms * up_ratio
+        self.up_frames = up_frames
+        self.max_up_frames = max_up_frames
+        self.level = len(QUALITY_LEVELS) - 1
+        self.fast_frames = 0
+        self.frames_since_up = None  # 上次升級後經過的幀數
+        self.changes = 0
+    
+    @property
+    def name(self):
+        return QUALITY_NAMES[self.level]
+    
+    def observe(self, frame_ms):
+        # 每幀呼叫一次；畫質改變時回傳新的等級，否則回傳 None
+        samples = self.samples
+        samples.append(frame_ms)
+        if self.frames_since_up is not None:
+            self.frames_since_up += 1
+        if len(samples) < samples.maxlen:
+            return None  # 剛改變畫質，先累積新等級的幀時間
+        
+        average = sum(samples) / len(samples)
+        if average > self.down_ms and self.level > 0:
+            if self.frames_since_up is not None and self.frames_since_up < self.up_frames:
+                self.up_frames = min(self.up_frames * 2, self.max_up_frames)
+            self.frames_since_up = None
+            return self.change(self.level - 1)
+        if average < self.up_ms and self.level < len(QUALITY_LEVELS) - 1:
+            self.fast_frames += 1
+            if self.fast_frames >= self.up_frames:
+                self.frames_since_up = 0
+                return self.change(self.level + 1)
+        else:
+            self.fast_frames = 0
+        return None
+    
+    def change(self, level):
+        self.level = level
+        self.samples.clear()
+        self.fast_frames = 0
+        self.changes += 1
+        return level
+
+def main(dirty_rects=False, fps=60, max_catchup=MAX_CATCHUP_STEPS, seed=None, record_path=None,
+         profile_csv=None, log_dump=None, startup_report=False, quality='auto', capture_path=None,
+         runs_db=None, scale='none', fullscreen=False, window_size=None):
+    # runs_db：每一局結果的資料庫路徑，空字串使用預設路徑，None 時不記錄
+    # scale、fullscreen、window_size：輸出到視窗的方式（見 Display），遊戲畫面永遠是 800x400
+    use_english_input()
+    display = Display("Dino Game", scale, fullscreen, window_size)
+    window = display.surface
+    # 輸入：只接收用到的事件，按鍵用查詢表對應到動作，並記錄跳躍的延遲
+    import dino_input
+    dino_input.restrict_events()
+    keymap = dino_input.InputMapper()
+    latency = dino_input.LatencyHistogram()
+    STARTUP.mark('init')
+    
+    # 在遊戲開始前添加這些調試信息
+    print("Game Controls:")
+    print("- SPACE/UP/W: Jump")
+    print("- R: Restart when game over")
+    print("- H: Toggle AI auto-jump")
+    print("- ESC: Exit game")
+    print("- F3: Toggle frame profiler")
+    
+    # 修改主遊戲循環的開始部分
+    if not show_start_screen(display):
+        pygame.quit()
+        return
+    STARTUP.skip()  # 等玩家按鍵的時間不算
+    
+    # 遊戲主要物件
+    state = GameState(seed)
+    renderer = GameRenderer(window, dirty_rects, display)
+    clock = pygame.time.Clock()
+    loop = FixedStepLoop(max_steps=max_catchup)
+    
+    # 效能分析：F3 顯示各階段的時間，--profile-csv 把每一幀的時間寫入 CSV
+    import dino_profiler
+    profiler = dino_profiler.FrameProfiler()
+    state.profiler = profiler
+    renderer.profiler = profiler
+    if profile_csv:
+        profiler.start_recording(profile_csv)
+    
+    # 畫質：auto 依幀時間自動調整，否則固定在指定的等級
+    controller = None
+    if quality == 'auto':
+        controller = QualityController(1000 / (fps or SIMULATION_HZ))
+    else:
+        renderer.set_quality(QUALITY_NAMES.index(quality))
+    profiler.quality = renderer.quality['name']
+    
+    # 錄影：遊戲執行緒只複製畫面，編碼和寫檔在背景執行緒
+    capture = None
+    if capture_path:
+        import dino_capture
+        capture = dino_capture.FrameCapture(capture_path, window)
+    STARTUP.mark('assets')
+    first_frame = True
+    
+    # 重置開始時間（這樣輸入提示才會從遊戲實際開始時計時）
+    start_time = ticks_ms()
+    running = True
+    jump = False       # 跳躍和切換 AI 會保留到下一個 tick 執行
+    toggle_ai = False
+    
+    # 錄製每一局的輸入，遊戲結束時存成重播檔
+    recorder = None
+    run = 1
+    if record_path:
+        import dino_replay
+        recorder = dino_replay.ReplayRecorder(state)
+    
+    # 每一局的結果由背景執行緒存進資料庫；記錄這一局 AI 和玩家是否跳過。
+    # AI 開關在 step() 一開始才套用，所以 ai_used 只在每個 tick 之後依照 AI 的狀態更新，
+    # 開局前就關掉 AI 的一局算是玩家的
+    runs = None
+    if runs_db is not None:
+        import dino_runs
+        runs = dino_runs.RunStore(runs_db or dino_runs.DEFAULT_PATH)
+    ai_used = False
+    player_jumped = False
+    
+    # 遊戲主循環
+    while running:
+        frame_start = time.perf_counter()
+        profiler.begin_frame()
+        
+        # 事件處理
+        latency.poll()
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.KEYDOWN:
+                if LOG.debug_enabled:  # 關閉時不查詢按鍵名稱和修飾鍵、不組字串
+                    LOG.debug("Key pressed: %s", pygame.key.name(event.key))
+                    LOG.debug("Key code: %s", event.key)
+                    LOG.debug("Key unicode: %s", event.unicode)
+                    LOG.debug("Key modifiers: %s", pygame.key.get_mods())
+                
+                action = keymap.action(event)
+                if action == dino_input.QUIT:
+                    running = False
+                elif action == dino_input.JUMP:
+                    LOG.debug("Jump detected!")
+                    jump = True
+                    latency.press()
+                elif action == dino_input.RESTART and state.game_over:
+                    # 重置恐龍、障礙物、背景和地形
+                    state.reset()
+                    state.dino_ai.enabled = True  # 如果之前開了 AI，保持開啟
+                    loop.reset()
+                    latency.cancel()
+                    ai_used = False
+                    player_jumped = False
+                    if recorder:
+                        run += 1
+                        recorder = dino_replay.ReplayRecorder(state)
+                elif action == dino_input.TOGGLE_AI:
+                    if state.game_over:
+                        state.dino_ai.toggle()
+                    else:
+                        toggle_ai = not toggle_ai
+                elif action == dino_input.PROFILER:
+                    profiler.toggle()
+        profiler.mark('events')
+        
+        # 依照經過的時間執行固定步長的模擬；有跳躍時這一幀至少執行一個 tick，按鍵馬上生效
+        for _ in range(loop.advance(jump and not state.game_over)):
+            if state.game_over:
+                break
+            was_jumping = state.dino.is_jumping
+            state.step(jump, toggle_ai)
+            if jump:
+                latency.applied(not was_jumping)
+                player_jumped = player_jumped or not was_jumping
+            ai_used = ai_used or state.dino_ai.enabled
+            if state.game_over:
+                LOG.info("Game over at %dm (seed %d)", state.dino.distance, state.seed)
+                if runs:
+                    runs.record(dino_runs.run_record(state, 'game', dino_runs.ai_mode(ai_used, player_jumped)))
+                if log_dump:
+                    LOG.dump(log_dump)
+            if recorder:
+                recorder.record(jump, toggle_ai)
+                if state.game_over:
+                    dino_replay.save_replay(recorder.finish(state), dino_replay.replay_path(record_path, run))
+            jump = toggle_ai = False
+        
+        # 遊戲結束後不再前進，直接畫出最後的位置
+        renderer.draw(state, 1 if state.game_over else loop.alpha)
+        
+        # 顯示輸入法提示（僅在開始的5秒內）
+        if ticks_ms() - start_time < REMINDER_DURATION:
+            draw_language_reminder(window, 36)
+        
+        if profiler.visible:
+            renderer.add_overlay(profiler.draw(window))
+        profiler.mark('overlay')
+        
+        renderer.present()
+        latency.presented()
+        if capture:
+            capture.capture(window)
+            profiler.mark('capture')
+        if controller:
+            level = controller.observe((time.perf_counter() - frame_start) * 1000)
+            if level is not None:
+                renderer.set_quality(level)
+                profiler.quality = controller.name
+                LOG.info("Quality changed to %s", controller.name)
+        profiler.end_frame()
+        if first_frame:
+            STARTUP.mark('first frame')
+            first_frame = False
+            if startup_report:
+                for line in STARTUP.report():
+                    LOG.info(line)
+        clock.tick(fps)  # fps 為 0 時不限制畫面更新率
+    
+    profiler.stop_recording()
+    if loop.dropped_steps:
+        # 畫面卡住太久時超過補跑上限的 tick 直接放棄，遊戲會比實際時間慢
+        LOG.warning("Dropped %d simulation ticks (more than %d per frame)", loop.dropped_steps, loop.max_steps)
+    if capture:
+        capture.close()
+        LOG.info("Captured %d frames to %s (%d dropped)", capture.written, capture_path, capture.dropped)
+    
+    # 離開時儲存還沒結束的這一局
+    if recorder and not state.game_over:
+        dino_replay.save_replay(recorder.finish(state), dino_replay.replay_path(record_path, run))
+    if runs:
+        if not state.game_over and state.ticks:
+            runs.record(dino_runs.run_record(state, 'game', dino_runs.ai_mode(ai_used, player_jumped)))
+        runs.close()
+    
+    # 顯示圖片讀取與縮放花費的時間，以及跳躍的延遲
+    for line in ASSETS.report() + latency.report():
+        LOG.info(line)
+    LOG.close()
+    pygame.quit()
+
+# 到這裡為止是 import 的時間
+STARTUP.mark('import')
+
+if __name__ == '__main__':
+    import argparse
+    
+    def seed_arg(text):
+        # 重播檔用 64 位元無號整數存種子，超出範圍的種子在開始前就拒絕，不要等到存檔時才失敗
+        try:
+            seed = int(text)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid seed: {text!r}")
+        if not 0 <= seed <= MASK64:
+            raise argparse.ArgumentTypeError(f"seed must be between 0 and {MASK64}")
+        return seed
+    
+    parser = argparse.ArgumentParser(description='Dino Run')
+    parser.add_argument('--dirty-rects', action='store_true',
+                        help='只更新有變化的區域（背景只在地形改變時重畫）')
+    parser.add_argument('--fps', type=int, default=60,
+                        help='畫面更新率上限，0 表示不限制（模擬固定為 60 tick/秒）')
+    parser.add_argument('--max-catchup', type=int, default=MAX_CATCHUP_STEPS,
+                        help='一幀最多補跑的模擬 tick 數')
+    parser.add_argument('--seed', type=seed_arg,
+                        help='第一局的亂數種子（0 到 2**64-1），用於重現同樣的地形和障礙物')
+    parser.add_argument('--record', metavar='PATH',
+                        help='把每一局的種子和輸入存成重播檔（用 dino_replay.py 播放）')
+    parser.add_argument('--profile-csv', metavar='PATH',
+                        help='把每一幀各階段的時間寫入 CSV 檔')
+    parser.add_argument('--log-level', default='info', choices=['debug', 'info', 'warning', 'error'],
+                        help='日誌等級，debug 會記錄每個按鍵和跳躍')
+    parser.add_argument('--log-dump', metavar='PATH',
+                        help='遊戲結束或當機時把最近的日誌寫入檔案')
+    parser.add_argument('--quality', default='auto', choices=['auto'] + QUALITY_NAMES,
+                        help='畫質等級，auto（預設）在畫面太慢時自動降低、恢復後再提高')
+    parser.add_argument('--startup-report', action='store_true',
+                        help='第一幀之後顯示啟動各階段的時間（import、初始化、讀取圖片、第一幀）')
+    parser.add_argument('--capture', metavar='PATH',
+                        help='把每一幀畫面錄到檔案（在背景執行緒編碼，跟不上時丟幀），用 dino_capture.py 解碼')
+    parser.add_argument('--runs-db', metavar='PATH', default='',
+                        help='每一局結果的資料庫（預設為遊戲資料夾的 runs.db），用 dino_runs.py 查詢')
+    parser.add_argument('--no-runs', action='store_true', help='不記錄每一局的結果')
+    parser.add_argument('--scale', default='none', choices=SCALE_MODES,
+                        help='縮放到視窗的方式：none（固定 800x400）、sdl（pygame.SCALED）、software')
+    parser.add_argument('--fullscreen', action='store_true',
+                        help='全螢幕（沒有指定 --scale 時使用 sdl）')
+    parser.add_argument('--window-size', metavar='WxH', type=lambda text: tuple(map(int, text.split('x'))),
+                        help='software 模式的視窗大小，例如 1600x800（預設 800x400）')
+    args = parser.parse_args()
+    LOG.set_level(args.log_level)
+    try:
+        main(dirty_rects=args.dirty_rects, fps=args.fps, max_catchup=args.max_catchup,
+             seed=args.seed, record_path=args.record, profile_csv=args.profile_csv,
+             log_dump=args.log_dump, startup_report=args.startup_report, quality=args.quality,
+             capture_path=args.capture, runs_db=None if args.no_runs else args.runs_db,
+             scale=args.scale, fullscreen=args.fullscreen, window_size=args.window_size)
+    except Exception:
+        import traceback
+        LOG.error("Crashed:\n%s", traceback.format_exc())
+        if args.log_dump:
+            LOG.dump(args.log_dump)
+        raise
@@ -0,0 +1,328 @@
+import argparse
+import json
+import random
+import time
+
+import numpy as np
+import pygame
+
+import dino_game
+import dino_tune
+
+# 恐龍的圖片依序編號：跑步動畫的兩張，最後是跳躍
+GHOST_FRAMES = dino_game.DINO_RUN_FRAMES + ('dino_jump',)
+JUMP_FRAME = len(GHOST_FRAMES) - 1
+
+
+def tune_params(path):
+    # dino_tune.py 的結果檔中完整評估過的參數，依平均距離由高到低（不分設定）
+    store = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                store[dino_tune.key(record['params'])] = record
+    return [record['params'] for record in dino_tune.ranking(store)]
+
+
+def population_params(count, seed=0, ranked=()):
+    # 第一隻使用預設參數，接著是 ranked 的參數，其餘在 dino_tune 的範圍內隨機取樣
+    rng = random.Random(seed)
+    params = [dict(dino_tune.DEFAULT_PARAMS)]
+    params += [p for p in ranked if p != params[0]]
+    while len(params) < count:
+        params.append(dino_tune.random_candidate(rng))
+    return params[:count]
+
+
+class GhostPopulation:
+    # 在同一個世界（同一條障礙物路線）中同時跑很多隻 AI 恐龍，每隻的 AI 參數可以不同。
+    # 障礙物和速度只和距離有關，所有恐龍看到的世界都一樣，只有高度和跳躍狀態不同，
+    # 所以世界只用一個 GameState，恐龍的物理、AI 和碰撞都用 NumPy 一次處理整個族群。
+    # 撞到的恐龍從陣列中移除，之後不再計算也不再繪製
+    enabled = True  # GameState 把族群當成 dino_ai 使用
+
+    def __init__(self, world, params, bias=None):
+        # bias：每隻恐龍的起跳距離多加的像素（正數提早跳），預設都是 0，和 DinoAI 完全相同
+        self.world = world
+        self.params = params
+        count = len(params)
+        # 世界本身的恐龍不會撞到障礙物，也不會跳。GameState.step 在恐龍更新之後、
+        # 障礙物生成和移動之前呼叫 dino_ai.update(obstacles)，和 AI 判斷的時機相同
+        world.collisions = False
+        world.dino_ai = self
+        dino = world.dino
+
+        # 參數相同的恐龍共用一個 DinoAI 規劃（plan 只和參數、障礙物和速度有關）
+        self.planners = []
+        known = {}
+        planner = []
+        for p in params:
+            key = (p['lookahead'], p['margin'], p['landing_margin'])
+            if key not in known:
+                ai = dino_game.DinoAI(dino)
+                ai.set_params(**p)
+                known[key] = len(self.planners)
+                self.planners.append(ai)
+            planner.append(known[key])
+
+        # 還活著的恐龍，每個陣列的第 i 個是同一隻（ids 是在 params 中的編號）
+        self.ids = np.arange(count)
+        self.planner = np.array(planner, dtype=np.int32)
+        self.biases = np.zeros(count) if bias is None else np.asarray(bias, dtype=np.float64)
+        self.bias = self.biases
+        self.y = np.full(count, float(dino.ground_y))
+        self.jump_speed = np.zeros(count)
+        self.is_jumping = np.zeros(count, dtype=bool)
+        self.animation_frame = np.zeros(count)
+        self.trigger = np.zeros(count)              # DinoAI.trigger
+        self.plan = np.full(count, -1, dtype=np.int64)  # DinoAI.plan_key 的編號，-1 表示 None
+        self.keys = {}  # (最近的障礙物, 障礙物數量, 速度) -> 編號
+
+        # 每隻恐龍的結果：撞到時的距離、tick 和障礙物
+        self.distance = np.full(count, np.nan)
+        self.ticks = np.zeros(count, dtype=np.int64)
+        self.killed_by = [None] * count
+        self.done = False  # 全部撞到或到達 tick 上限
+
+    @property
+    def alive(self):
+        return len(self.ids)
+
+    def update(self, obstacles):
+        # 整個族群的 Dino.update 和 DinoAI.update
+        dino = self.world.dino
+        air = self.is_jumping
+        y = np.where(air, self.y + self.jump_speed, self.y)
+        jump_speed = np.where(air, self.jump_speed + dino.gravity, self.jump_speed)
+        landed = air & (y >= dino.ground_y)
+        y[landed] = dino.ground_y
+        jump_speed[landed] = 0
+        is_jumping = air & ~landed
+        frame = np.where(air, self.animation_frame, self.animation_frame + dino.animation_speed)
+        frame[(frame >= len(dino_game.DINO_RUN_FRAMES)) | landed] = 0
+
+        # DinoAI.should_jump：跳躍中的恐龍落地後重新規劃
+        self.plan[is_jumping] = -1
+        for obstacle in obstacles:
+            if obstacle.x + obstacle.width > dino.x:
+                break
+        else:
+            obstacle = None  # 前面沒有障礙物
+        if obstacle is not None and len(y):
+            distance = obstacle.x - dino.x - dino.width
+            key = self.keys.setdefault((obstacle, len(obstacles), dino.speed), len(self.keys))
+            stale = np.flatnonzero(~is_jumping & (self.plan != key))
+            if len(stale):
+                # 同一個 tick 所有恐龍的距離和速度都一樣，每組參數只需要規劃一次
+                planners, inverse = np.unique(self.planner[stale], return_inverse=True)
+                triggers = [self.planners[p].plan(obstacles, obstacle, distance) for p in planners]
+                self.trigger[stale] = np.array(triggers)[inverse]
+                self.plan[stale] = key
+            jump = ~is_jumping & (distance <= self.trigger + self.bias)
+            jump_speed[jump] = dino.jump_velocity
+            is_jumping |= jump
+
+        self.y = y
+        self.jump_speed = jump_speed
+        self.is_jumping = is_jumping
+        self.animation_frame = frame
+
+    def frames(self):
+        # 每隻恐龍目前的圖片編號（GHOST_FRAMES）
+        return np.where(self.is_jumping, JUMP_FRAME, self.animation_frame.astype(np.int32))
+
+    def collide(self):
+        # 世界前進一個 tick 之後呼叫（和 GameState.collides 相同的判斷），回傳這個 tick 撞到幾隻
+        world = self.world
+        dino = world.dino
+        hit = np.zeros(len(self.ids), dtype=bool)
+        for obstacle in world.obstacles:
+            if obstacle.x >= dino.x + dino.width:
+                break
+            if obstacle.x + obstacle.width <= dino.x:
+                continue
+            # 外框重疊的恐龍才比對遮罩
+            rows = np.flatnonzero(~hit & (self.y < obstacle.y + obstacle.height) &
+                                  (self.y + dino.height > obstacle.y))
+            if not len(rows):
+                continue
+            name = obstacle.sprite()[0]
+            if world.pixel_collisions:
+                size = (dino.width, dino.height)
+                frames = self.frames()
+                rows = [i for i in rows
+                        if dino_game.ASSETS.mask(GHOST_FRAMES[frames[i]], size).overlap(
+                            obstacle.mask, (int(obstacle.x) - int(dino.x), int(obstacle.y) - int(self.y[i])))]
+            for i in rows:
+                hit[i] = True
+                self.killed_by[self.ids[i]] = name
+        if not hit.any():
+            return 0
+        dead = self.ids[hit]
+        self.distance[dead] = dino.distance
+        self.ticks[dead] = world.ticks
+        keep = ~hit
+        for name in ('ids', 'planner', 'bias', 'y', 'jump_speed', 'is_jumping', 'animation_frame',
+                     'trigger', 'plan'):
+            setattr(self, name, getattr(self, name)[keep])
+        return len(dead)
+
+    def step(self, max_ticks):
+        # 前進一個 tick，回傳是否結束（全部撞到或到達 tick 上限）
+        if not self.done:
+            self.world.step()
+            self.collide()
+            if self.world.ticks >= max_ticks or not len(self.ids):
+                self.finish()
+        return self.done
+
+    def finish(self):
+        # 還活著的恐龍記錄目前的距離
+        self.distance[self.ids] = self.world.dino.distance
+        self.ticks[self.ids] = self.world.ticks
+        self.done = True
+
+    def ranking(self):
+        # (距離, 編號) 由遠到近，撞到的恐龍距離相同時依編號
+        return sorted(((float(self.distance[i]), i) for i in range(len(self.params))),
+                      key=lambda item: (-item[0], item[1]))
+
+
+class GhostRenderer:
+    # 所有恐龍共用同一組半透明圖片，每幀用一次 Surface.blits 畫完整個族群。
+    # 圖片和高度（整數像素）都相同的恐龍疊在同一個位置，k 隻疊起來和不透明度
+    # 1 - (1 - a)^k 的一張圖片看起來一樣，所以每組只畫一次，使用對應疊幾層的圖片
+    def __init__(self, surface, opacity=60, max_stack=32):
+        self.surface = surface
+        self.parallax = dino_game.ParallaxBackground()
+        dino = dino_game.Dino()
+        # images[疊幾層 - 1][圖片編號]
+        self.images = []
+        for stack in range(1, max_stack + 1):
+            alpha = round(255 * (1 - (1 - opacity / 255) ** stack))
+            row = []
+            for name in GHOST_FRAMES:
+                image = dino_game.ASSETS.get(name, (dino.width, dino.height)).copy()
+                image.set_alpha(alpha)
+                row.append(image)
+            self.images.append(row)
+
+    def draw(self, population):
+        surface = self.surface
+        world = population.world
+        self.parallax.draw(surface, world.background)
+        for obstacle in world.obstacles:
+            obstacle.draw(surface)
+        if population.alive:
+            count = len(GHOST_FRAMES)
+            groups, stacks = np.unique(population.y.astype(np.int64) * count + population.frames(),
+                                       return_counts=True)
+            images = self.images
+            top = len(images)
+            x = world.dino.x
+            surface.blits([(images[min(stack, top) - 1][group % count], (x, group // count))
+                           for group, stack in zip(groups.tolist(), stacks.tolist())], False)
+
+        text = dino_game.TEXT
+        text.blit_number(surface, (10, 10), 'Distance: ', int(world.dino.distance), 'm', 36,
+                         dino_game.BLACK)
+        text.blit_number(surface, (10, 45), 'Ghosts: ', population.alive,
+                         f'/{len(population.params)}', 36, dino_game.BLACK)
+        if population.done:
+            message = text.render('Press R for the next seed', 36, dino_game.BLACK)
+            surface.blit(message, (dino_game.WINDOW_WIDTH // 2 - message.get_width() // 2,
+                                   dino_game.WINDOW_HEIGHT // 2))
+
+
+def new_population(seed, params, args):
+    world = dino_game.GameState(seed, scenery=args.render)
+    world.obstacle_manager.base_gap = args.base_gap
+    world.spawn_chance = args.spawn_chance
+    bias = None
+    if args.jitter:
+        rng = np.random.default_rng(seed)
+        bias = rng.uniform(-args.jitter, args.jitter, len(params))
+        bias[0] = 0  # 第一隻保持和 DinoAI 完全相同
+    return GhostPopulation(world, params, bias)
+
+
+def play_window(seed, params, args):
+    dino_game.init_display()
+    window = pygame.display.set_mode((dino_game.WINDOW_WIDTH, dino_game.WINDOW_HEIGHT))
+    pygame.display.set_caption("Dino Game - Ghosts")
+    renderer = GhostRenderer(window, args.opacity)
+    clock = pygame.time.Clock()
+    population = new_population(seed, params, args)
+    frame_times = []
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and
+                                             event.key == pygame.K_ESCAPE):
+                population.finish()
+                return population, seed, frame_times
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_r and population.done:
+                print_report(population, seed, args.top)
+                seed += 1
+                population = new_population(seed, params, args)
+        start = time.perf_counter()
+        population.step(args.max_ticks)
+        renderer.draw(population)
+        frame_times.append(time.perf_counter() - start)
+        pygame.display.flip()
+        clock.tick(args.fps)
+
+
+def print_report(population, seed, top):
+    params = population.params
+    print(f"Seed {seed}: {len(params)} ghosts, {len(population.planners)} distinct parameter sets")
+    print(f"{'#':>4} {'lookahead':>9} {'margin':>7} {'landing':>7} {'bias':>6}   {'distance':>8} "
+          f"{'ticks':>6} killed by")
+    for distance, i in population.ranking()[:top]:
+        p = params[i]
+        print(f"{i:>4} {p['lookahead']:>9} {p['margin']:>7.2f} {p['landing_margin']:>7.2f} "
+              f"{population.biases[i]:>6.1f}   {distance:>7.0f}m {population.ticks[i]:>6} "
+              f"{population.killed_by[i] or '-'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Dino Run ghost population')
+    parser.add_argument('--ghosts', type=int, default=500, help='同時跑幾隻恐龍')
+    parser.add_argument('--seed', type=int, default=0, help='世界的種子（所有恐龍相同）')
+    parser.add_argument('--param-seed', type=int, default=0, help='隨機取樣參數用的種子')
+    parser.add_argument('--tune-results', metavar='PATH',
+                        help='先使用 dino_tune.py 結果檔中平均距離最高的參數')
+    parser.add_argument('--jitter', type=float, default=0.0,
+                        help='每隻恐龍的起跳距離隨機多加或少加最多幾個像素（第一隻除外）')
+    parser.add_argument('--max-ticks', type=int, default=30000, help='最多幾個 tick')
+    parser.add_argument('--base-gap', type=int, default=400, help='障礙物基本間距')
+    parser.add_argument('--spawn-chance', type=float, default=dino_game.OBSTACLE_SPAWN_CHANCE)
+    parser.add_argument('--render', action='store_true', help='在視窗中播放')
+    parser.add_argument('--fps', type=int, default=60, help='視窗模式的畫面更新率上限')
+    parser.add_argument('--opacity', type=int, default=60, help='恐龍的不透明度（0-255）')
+    parser.add_argument('--top', type=int, default=10, help='報告中顯示幾隻最遠的恐龍')
+    args = parser.parse_args()
+
+    ranked = tune_params(args.tune_results) if args.tune_results else ()
+    params = population_params(args.ghosts, args.param_seed, ranked)
+    if args.render:
+        population, seed, frame_times = play_window(args.seed, params, args)
+        pygame.quit()
+        if frame_times:
+            frame_times.sort()
+            print(f"Update and draw per frame: p50 {frame_times[len(frame_times) // 2] * 1000:.2f}ms, "
+                  f"p99 {frame_times[int(len(frame_times) * 0.99)] * 1000:.2f}ms")
+    else:
+        seed = args.seed
+        population = new_population(seed, params, args)
+        start = time.perf_counter()
+        while not population.step(args.max_ticks):
+            pass
+        elapsed = time.perf_counter() - start
+        print(f"{population.world.ticks} ticks in {elapsed:.2f}s "
+              f"({population.world.ticks / elapsed:,.0f} ticks/s, {len(params)} ghosts)")
+    print_report(population, seed, args.top)
+
+
+if __name__ == '__main__':
+    main()
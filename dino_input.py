@@ -0,0 +1,139 @@
+import time
+
+import pygame
+
+# 按鍵對應的動作
+JUMP = 'jump'
+QUIT = 'quit'
+RESTART = 'restart'
+TOGGLE_AI = 'toggle_ai'
+PROFILER = 'profiler'
+
+# 只讓遊戲用到的事件進入佇列，滑鼠和搖桿等事件 SDL 直接丟掉。
+# KEYDOWN 的 unicode 來自輸入法的 TEXTINPUT 事件，所以 TEXTINPUT 不能擋掉；
+# 可以調整大小的視窗需要 VIDEORESIZE，pygame 才會更新視窗的 Surface
+ALLOWED_EVENTS = (pygame.QUIT, pygame.KEYDOWN, pygame.TEXTINPUT, pygame.VIDEORESIZE)
+
+# 按鍵碼 -> 動作
+KEY_ACTIONS = {
+    pygame.K_ESCAPE: QUIT,
+    pygame.K_SPACE: JUMP,
+    pygame.K_UP: JUMP,
+    pygame.K_w: JUMP,
+    pygame.K_r: RESTART,
+    pygame.K_h: TOGGLE_AI,
+    pygame.K_F3: PROFILER,
+}
+
+# 輸入法輸入的字元 -> 動作（全形字母、注音輸入法下 W 鍵的「ㄊ」）
+CHAR_ACTIONS = {
+    'w': JUMP,
+    'ｗ': JUMP,
+    'ㄊ': JUMP,
+    'r': RESTART,
+    'ｒ': RESTART,
+}
+
+
+def build_keymap():
+    # 啟動時建立一次查詢表，事件處理只需要查 dict，不用查按鍵名稱或轉換大小寫
+    chars = dict(CHAR_ACTIONS)
+    for char, action in CHAR_ACTIONS.items():
+        chars[char.upper()] = action
+    return dict(KEY_ACTIONS), chars
+
+
+def restrict_events():
+    # 在 pygame.display 初始化之後呼叫
+    pygame.event.set_blocked(None)
+    pygame.event.set_allowed(list(ALLOWED_EVENTS))
+
+
+class InputMapper:
+    def __init__(self):
+        self.keys, self.chars = build_keymap()
+
+    def action(self, event):
+        # KEYDOWN 事件對應的動作，沒有對應時回傳 None
+        action = self.keys.get(event.key)
+        if action is None and event.unicode:
+            action = self.chars.get(event.unicode)
+        return action
+
+
+class LatencyHistogram:
+    # 從按下跳躍到第一次顯示跳躍圖片的畫面 flip 完成的時間，依 bucket_ms 的區間統計。
+    # pygame 的事件沒有時間戳記，按鍵最早可能在上一次讀取事件之後按下，所以從那時開始計時；
+    # 這是上限，包括按鍵在佇列中等待下一幀的時間
+    def __init__(self, bucket_ms=2, buckets=25):
+        self.bucket_ms = bucket_ms
+        self.counts = [0] * (buckets + 1)  # 最後一格是超過範圍的
+        self.samples = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.ignored = 0      # 已經在空中、沒有讓恐龍起跳的按鍵
+        self.pressed = None   # 還沒套用的按鍵時間
+        self.started = None   # 已經起跳、還沒顯示的按鍵時間
+        self.last_poll = None
+        self.since = None     # 這一幀取出的按鍵最早的按下時間
+
+    def poll(self):
+        # 每一幀讀取事件之前呼叫
+        now = time.perf_counter()
+        self.since = self.last_poll if self.last_poll is not None else now
+        self.last_poll = now
+
+    def press(self):
+        if self.pressed is None:
+            self.pressed = self.since
+
+    def applied(self, jumped):
+        # 套用按鍵的 tick 之後呼叫：jumped 表示這次按鍵讓恐龍起跳
+        if self.pressed is None:
+            return
+        if jumped:
+            self.started = self.pressed
+        else:
+            self.ignored += 1
+        self.pressed = None
+
+    def cancel(self):
+        self.pressed = self.started = None
+
+    def presented(self):
+        # 畫面 flip 之後呼叫
+        if self.started is None:
+            return
+        ms = (time.perf_counter() - self.started) * 1000
+        self.started = None
+        self.counts[min(int(ms / self.bucket_ms), len(self.counts) - 1)] += 1
+        self.samples += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def percentile(self, p):
+        # 以區間的上限估計
+        target = self.samples * p / 100
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= target:
+                return (i + 1) * self.bucket_ms if i < len(self.counts) - 1 else self.max
+        return 0.0
+
+    def report(self):
+        if not self.samples:
+            return [f"Jump latency: no jumps ({self.ignored} presses while airborne)"]
+        lines = [f"Jump latency: {self.samples} jumps, mean {self.total / self.samples:.1f}ms, "
+                 f"p50 <{self.percentile(50):.0f}ms, p95 <{self.percentile(95):.0f}ms, "
+                 f"p99 <{self.percentile(99):.0f}ms, max {self.max:.1f}ms "
+                 f"({self.ignored} presses while airborne)"]
+        peak = max(self.counts)
+        last = len(self.counts) - 1
+        for i, count in enumerate(self.counts):
+            if not count:
+                continue
+            label = (f"{i * self.bucket_ms:>3}-{(i + 1) * self.bucket_ms:<3}ms" if i < last
+                     else f">={i * self.bucket_ms:<5}ms")
+            lines.append(f"  {label} {'#' * max(int(count / peak * 40), 1)} {count}")
+        return lines
@@ -0,0 +1,114 @@
+import atexit
+import sys
+import threading
+import time
+from collections import deque
+
+# 日誌等級
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVEL_NAMES = {DEBUG: 'DEBUG', INFO: 'INFO', WARNING: 'WARNING', ERROR: 'ERROR'}
+LEVELS = {name.lower(): level for level, name in LEVEL_NAMES.items()}
+
+
+class RingLogger:
+    # 訊息只放進固定大小的環狀緩衝區，由背景執行緒寫到 stream，遊戲循環不會等待 I/O
+    def __init__(self, capacity=4096, level=INFO, stream=None, flush_interval=0.1):
+        self.buffer = deque(maxlen=capacity)  # (序號, 時間, 等級, 訊息)
+        self.capacity = capacity
+        self.stream = stream
+        self.flush_interval = flush_interval
+        self.set_level(level)
+
+        self.sequence = 0  # 最後一則訊息的序號
+        self.flushed = 0   # 已經寫出的最後序號
+        self.thread = None
+        self.wakeup = threading.Event()
+        self.stopping = False
+        self.registered = False
+
+    def set_level(self, level):
+        if isinstance(level, str):
+            level = LEVELS[level.lower()]
+        self.level = level
+        # 呼叫端可以先檢查這個值，關閉時連參數都不用準備
+        self.debug_enabled = level <= DEBUG
+
+    def log(self, level, msg, *args):
+        if level < self.level:
+            return
+        if args:
+            msg = msg % args
+        self.sequence += 1
+        self.buffer.append((self.sequence, time.time(), level, msg))
+        if self.thread is None:
+            self._start()
+
+    def debug(self, msg, *args):
+        if self.debug_enabled:
+            self.log(DEBUG, msg, *args)
+
+    def info(self, msg, *args):
+        self.log(INFO, msg, *args)
+
+    def warning(self, msg, *args):
+        self.log(WARNING, msg, *args)
+
+    def error(self, msg, *args):
+        self.log(ERROR, msg, *args)
+
+    def _start(self):
+        # 第一次有訊息時才啟動背景執行緒
+        self.thread = threading.Thread(target=self._run, name='dino-log', daemon=True)
+        self.thread.start()
+        if not self.registered:
+            atexit.register(self.close)
+            self.registered = True
+
+    def _run(self):
+        while not self.stopping:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        entries = [entry for entry in list(self.buffer) if entry[0] > self.flushed]
+        if not entries:
+            return
+        stream = self.stream or sys.stdout
+        lost = entries[0][0] - self.flushed - 1
+        if lost > 0:
+            # 寫出的速度跟不上時，最舊的訊息已經被覆蓋
+            stream.write(f"... {lost} log messages dropped\n")
+        for _, _, level, msg in entries:
+            if level >= WARNING:
+                stream.write(f"{LEVEL_NAMES[level]}: {msg}\n")
+            else:
+                stream.write(msg + '\n')
+        stream.flush()
+        self.flushed = entries[-1][0]
+
+    def dump(self, path):
+        # 把緩衝區裡最近的所有訊息寫到檔案（遊戲結束或當機時使用）
+        with open(path, 'w', encoding='utf-8') as f:
+            for _, timestamp, level, msg in list(self.buffer):
+                stamp = time.strftime('%H:%M:%S', time.localtime(timestamp))
+                f.write(f"{stamp}.{int(timestamp % 1 * 1000):03d} {LEVEL_NAMES[level]:<7} {msg}\n")
+
+    def close(self):
+        # 停止背景執行緒並寫出剩下的訊息；之後再有訊息會重新啟動執行緒
+        if self.thread is not None:
+            self.stopping = True
+            self.wakeup.set()
+            self.thread.join()
+            self.thread = None
+            self.stopping = False
+        self.flush()
+
+
+# 遊戲共用的日誌
+LOG = RingLogger()
@@ -0,0 +1,166 @@
+import csv
+import queue
+import threading
+import time
+from collections import deque
+
+import pygame
+
+import dino_game
+from dino_log import LOG
+
+# 主循環的各個階段，依執行順序排列
+PHASES = (
+    'events',
+    'dino_update',
+    'ai_update',
+    'spawn',
+    'obstacles',
+    'background_update',
+    'background_draw',
+    'sprites',
+    'hud',
+    'overlay',
+    'flip',
+    'capture',
+)
+
+FRAME_BUDGET_MS = 1000 / 60  # 60 FPS 時每幀的時間預算
+
+
+class CsvRecorder:
+    # 在背景執行緒把每一幀的時間寫入 CSV，遊戲循環只需要放進佇列
+    def __init__(self, path, max_pending=1024):
+        self.path = path
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.dropped = 0  # 佇列滿時丟掉的幀數
+        self.thread = threading.Thread(target=self._run, name='profiler-csv', daemon=True)
+        self.thread.start()
+
+    def write(self, row):
+        try:
+            self.queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+    def _run(self):
+        with open(self.path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(('frame', 'time') + PHASES + ('total', 'quality'))
+            while True:
+                row = self.queue.get()
+                if row is None:
+                    break
+                writer.writerow(row)
+
+
+class FrameProfiler:
+    def __init__(self, history=120):
+        self.history = history
+        self.visible = False
+        self.recorder = None
+        self.frame = 0
+        self.current = dict.fromkeys(PHASES, 0.0)
+        self.last_mark = 0.0
+        self.frame_start = 0.0
+        self.quality = None  # 目前的畫質等級名稱，記錄在 CSV 中
+
+        # 最近 history 幀的時間（毫秒），用於移動平均和幀時間圖
+        self.samples = {phase: deque(maxlen=history) for phase in PHASES}
+        self.totals = dict.fromkeys(PHASES, 0.0)
+        self.frame_times = deque(maxlen=history)
+
+        # 疊加顯示的文字每 15 幀更新一次，避免每幀重新渲染數字
+        self.panel = None
+        self.panel_frame = -1
+
+    def toggle(self):
+        self.visible = not self.visible
+
+    def start_recording(self, path):
+        self.recorder = CsvRecorder(path)
+
+    def stop_recording(self):
+        if self.recorder:
+            self.recorder.close()
+            if self.recorder.dropped:
+                LOG.warning("Profiler dropped %d frames while writing %s", self.recorder.dropped,
+                            self.recorder.path)
+            self.recorder = None
+
+    def begin_frame(self):
+        self.frame_start = self.last_mark = time.perf_counter()
+        current = self.current
+        for phase in current:
+            current[phase] = 0.0
+
+    def mark(self, phase):
+        # 把上一個記號到現在的時間算到這個階段
+        now = time.perf_counter()
+        self.current[phase] += now - self.last_mark
+        self.last_mark = now
+
+    def end_frame(self):
+        total = (self.last_mark - self.frame_start) * 1000
+        row = [self.frame, time.time()]
+        for phase in PHASES:
+            ms = self.current[phase] * 1000
+            samples = self.samples[phase]
+            if len(samples) == self.history:
+                self.totals[phase] -= samples[0]
+            samples.append(ms)
+            self.totals[phase] += ms
+            row.append(round(ms, 4))
+        row.append(round(total, 4))
+        row.append(self.quality)
+        self.frame_times.append(total)
+        if self.recorder:
+            self.recorder.write(row)
+        self.frame += 1
+
+    def averages(self):
+        count = max(len(self.frame_times), 1)
+        return {phase: self.totals[phase] / count for phase in PHASES}
+
+    def draw(self, surface, pos=(10, 60)):
+        if self.panel is None or self.frame - self.panel_frame >= 15:
+            self.panel = self._render_panel()
+            self.panel_frame = self.frame
+        rect = surface.blit(self.panel, pos)
+
+        # 幀時間圖：每一幀一條線，超過預算的用紅色
+        graph_x = pos[0] + 8
+        graph_bottom = rect.bottom - 8
+        scale = 40 / (FRAME_BUDGET_MS * 2)  # 圖高 40 像素對應兩倍預算
+        for i, ms in enumerate(self.frame_times):
+            height = min(int(ms * scale), 40)
+            color = (220, 60, 60) if ms > FRAME_BUDGET_MS else (80, 200, 80)
+            pygame.draw.line(surface, color, (graph_x + i, graph_bottom),
+                             (graph_x + i, graph_bottom - height))
+        budget_y = graph_bottom - int(FRAME_BUDGET_MS * scale)
+        pygame.draw.line(surface, (240, 240, 240), (graph_x, budget_y),
+                         (graph_x + self.history, budget_y))
+        return rect
+
+    def _render_panel(self):
+        line_height = 14
+        width = max(self.history + 16, 200)
+        height = (len(PHASES) + 1) * line_height + 12 + 48  # 文字加上幀時間圖
+        panel = pygame.Surface((width, height))
+        panel.fill((30, 30, 30))
+
+        # 階段名稱使用文字快取，只有數字每次重新渲染
+        averages = self.averages()
+        total = sum(self.frame_times) / max(len(self.frame_times), 1)
+        rows = [('frame', total)] + [(phase, averages[phase]) for phase in PHASES]
+        font = dino_game.TEXT.font(14)
+        for i, (label, ms) in enumerate(rows):
+            y = 6 + i * line_height
+            panel.blit(dino_game.TEXT.render(label, 14, (240, 240, 240)), (8, y))
+            value = font.render(f"{ms:.2f} ms", True, (240, 240, 240))
+            panel.blit(value, (width - 8 - value.get_width(), y))
+        return panel
@@ -0,0 +1,191 @@
+import argparse
+import os
+import struct
+import sys
+
+import pygame
+
+import dino_game
+
+# 重播檔格式：
+#   檔頭：魔術字串、版本、亂數種子、AI 初始狀態、tick 數、結束時的狀態雜湊
+#   內容：每個 tick 的輸入以 run-length 編碼，每一段為「輸入值（1 byte）+ 重複次數（varint）」
+MAGIC = b'DINR'
+VERSION = 5  # 2：碰撞改用像素遮罩，3：新的 AI 跳躍規劃，4：景物使用自己的亂數，5：障礙物改用事先產生的路線
+HEADER = struct.Struct('<4sBQ?I8s')
+
+# 每個 tick 的輸入位元
+JUMP = 1
+TOGGLE_AI = 2
+
+
+class Replay:
+    def __init__(self, seed, ai_enabled, inputs, final_hash=None):
+        self.seed = seed
+        self.ai_enabled = ai_enabled
+        self.inputs = inputs          # bytearray，每個 tick 一個 byte
+        self.final_hash = final_hash  # 結束時 GameState.state_hash() 的值
+
+    @property
+    def ticks(self):
+        return len(self.inputs)
+
+
+class ReplayRecorder:
+    def __init__(self, state):
+        # 從一局的開頭開始錄製
+        self.seed = state.seed
+        self.ai_enabled = state.dino_ai.enabled
+        self.inputs = bytearray()
+
+    def record(self, jump=False, toggle_ai=False):
+        self.inputs.append((JUMP if jump else 0) | (TOGGLE_AI if toggle_ai else 0))
+
+    def finish(self, state):
+        return Replay(self.seed, self.ai_enabled, self.inputs, state.state_hash())
+
+
+def encode_runs(inputs):
+    data = bytearray()
+    i = 0
+    while i < len(inputs):
+        value = inputs[i]
+        count = 1
+        while i + count < len(inputs) and inputs[i + count] == value:
+            count += 1
+        data.append(value)
+        i += count
+        # 重複次數使用 varint：每個 byte 存 7 個位元，最高位元表示後面還有
+        while count >= 0x80:
+            data.append((count & 0x7f) | 0x80)
+            count >>= 7
+        data.append(count)
+    return bytes(data)
+
+
+def decode_runs(data):
+    inputs = bytearray()
+    pos = 0
+    while pos < len(data):
+        value = data[pos]
+        pos += 1
+        count = 0
+        shift = 0
+        while True:
+            byte = data[pos]
+            pos += 1
+            count |= (byte & 0x7f) << shift
+            shift += 7
+            if not byte & 0x80:
+                break
+        inputs.extend(bytes([value]) * count)
+    return inputs
+
+
+def save_replay(replay, path):
+    final_hash = bytes.fromhex(replay.final_hash) if replay.final_hash else bytes(8)
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, replay.seed, replay.ai_enabled,
+                            replay.ticks, final_hash))
+        f.write(encode_runs(replay.inputs))
+
+
+def load_replay(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, version, seed, ai_enabled, ticks, final_hash = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a Dino Run replay (version {VERSION})")
+    inputs = decode_runs(data[HEADER.size:])
+    if len(inputs) != ticks:
+        raise ValueError(f"{path} is truncated: expected {ticks} ticks, got {len(inputs)}")
+    return Replay(seed, ai_enabled, inputs, final_hash.hex())
+
+
+def replay_path(path, run):
+    # 第一局使用指定的檔名，之後的局在檔名後面加上編號
+    if run <= 1:
+        return path
+    stem, ext = os.path.splitext(path)
+    return f"{stem}-{run}{ext}"
+
+
+def new_state(replay, scenery=True):
+    state = dino_game.GameState(replay.seed, scenery)
+    state.dino_ai.enabled = replay.ai_enabled
+    return state
+
+
+def simulate(replay):
+    # 不開視窗、不限制速度地重新模擬整局，回傳結束時的狀態（景物不影響結果，不需要更新）
+    state = new_state(replay, scenery=False)
+    step = state.step
+    for value in replay.inputs:
+        step(value & JUMP, value & TOGGLE_AI)
+    return state
+
+
+def verify(replay):
+    state = simulate(replay)
+    return state.state_hash() == replay.final_hash, state
+
+
+def play(replay, fps=60, capture_path=None):
+    # 在視窗中以正常速度播放重播，capture_path 不是 None 時同時錄影
+    dino_game.init_display()
+    window = pygame.display.set_mode((dino_game.WINDOW_WIDTH, dino_game.WINDOW_HEIGHT))
+    pygame.display.set_caption("Dino Game - Replay")
+    state = new_state(replay)
+    renderer = dino_game.GameRenderer(window)
+    clock = pygame.time.Clock()
+    capture = None
+    if capture_path:
+        import dino_capture
+        capture = dino_capture.FrameCapture(capture_path, window)
+
+    try:
+        for value in replay.inputs:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and
+                                                 event.key == pygame.K_ESCAPE):
+                    return state
+            state.step(value & JUMP, value & TOGGLE_AI)
+            renderer.draw(state)
+            renderer.present()
+            if capture:
+                capture.capture(window)
+            clock.tick(fps)
+        return state
+    finally:
+        if capture:
+            capture.close()
+            print(f"Captured {capture.written} frames to {capture_path} ({capture.dropped} dropped)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Dino Run replay player')
+    parser.add_argument('path', help='重播檔路徑')
+    parser.add_argument('--render', action='store_true', help='在視窗中播放，而不是無頭模擬')
+    parser.add_argument('--fps', type=int, default=60, help='播放時的畫面更新率，0 表示不限制')
+    parser.add_argument('--capture', metavar='PATH', help='播放時把每一幀錄到檔案（需要 --render）')
+    args = parser.parse_args()
+
+    replay = load_replay(args.path)
+    print(f"Seed: {replay.seed}, ticks: {replay.ticks}, AI: {'ON' if replay.ai_enabled else 'OFF'}")
+
+    if args.render:
+        state = play(replay, args.fps, args.capture)
+        pygame.quit()
+    else:
+        state = simulate(replay)
+    print(f"Distance: {int(state.dino.distance)}m, game over: {state.game_over}")
+
+    if state.ticks == replay.ticks:
+        ok = state.state_hash() == replay.final_hash
+        print(f"Final state hash: {'OK' if ok else 'MISMATCH'} ({state.state_hash()})")
+        if not ok:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
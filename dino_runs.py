@@ -0,0 +1,186 @@
+import argparse
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from dino_log import LOG
+
+# 每一局的結果存在 SQLite 資料庫，遊戲、AI 參數調整和搜尋共用同一個檔案，用 source 區分
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'runs.db')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    time REAL NOT NULL,
+    source TEXT NOT NULL,
+    seed INTEGER NOT NULL,
+    distance REAL NOT NULL,
+    max_speed REAL NOT NULL,
+    terrain TEXT NOT NULL,
+    ai TEXT NOT NULL,
+    killed_by TEXT,
+    ticks INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_distance ON runs (distance DESC);
+CREATE INDEX IF NOT EXISTS runs_source ON runs (source, ai, distance);
+CREATE INDEX IF NOT EXISTS runs_killed_by ON runs (killed_by, terrain);
+'''
+# 欄位：
+#   time：結束的時間（Unix 時間），source：產生這一局的程式（game、tune、search）
+#   terrain：結束時到達的地形，max_speed：結束時的速度（速度只會增加，就是最高速度）
+#   ai：player（玩家自己玩）、ai（全程 AI）、mixed（玩家和 AI 都有跳）、search（dino_search 的搜尋）
+#   killed_by：撞到的障礙物（rock、cactus、bird），中途離開或達到 tick 上限時為 NULL
+# 索引：
+#   runs_distance：最高分；runs_source：依來源和 AI 模式的最高分，以及平均、最高距離的統計
+#   （只讀索引就能算完）；runs_killed_by：各種障礙物和地形的死因統計
+COLUMNS = ('time', 'source', 'seed', 'distance', 'max_speed', 'terrain', 'ai', 'killed_by', 'ticks')
+INSERT = f"INSERT INTO runs ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+
+
+def connect(path=DEFAULT_PATH):
+    # WAL 模式：查詢不會擋住寫入，寫入也不會擋住查詢
+    db = sqlite3.connect(path)
+    db.execute('PRAGMA journal_mode=WAL')
+    db.execute('PRAGMA synchronous=NORMAL')
+    db.executescript(SCHEMA)
+    return db
+
+
+def run_record(state, source, ai):
+    # 一局結束（或中途離開）時 GameState 的結果，欄位順序和 COLUMNS 相同
+    dino = state.dino
+    return (time.time(), source, state.seed, dino.distance, dino.speed,
+            state.background.terrain_type, ai, state.killed_by, state.ticks)
+
+
+def ai_mode(ai_used, player_jumped):
+    # 遊戲中 AI 可以隨時開關：AI 沒開過是 player，AI 開過而玩家沒讓恐龍起跳過是 ai，兩者都有是 mixed
+    if not ai_used:
+        return 'player'
+    return 'mixed' if player_jumped else 'ai'
+
+
+class RunStore:
+    # record() 只把結果放進佇列，背景執行緒一次取出所有等待中的結果（最多 batch_size 筆），
+    # 在同一個交易中寫入，呼叫端不會等待磁碟。佇列滿時丟掉並計數
+    def __init__(self, path=DEFAULT_PATH, batch_size=10000, max_pending=100000):
+        self.path = path
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.written = 0
+        self.dropped = 0
+        connect(path).close()  # 在呼叫端建立資料表，無法開啟時馬上顯示錯誤
+        self.thread = threading.Thread(target=self._run, name='run-store', daemon=True)
+        self.thread.start()
+
+    def record(self, run):
+        try:
+            self.queue.put_nowait(run)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, timeout=5.0):
+        # 背景執行緒已經結束（例如寫入失敗）或卡住時不會一直等：最多等 timeout 秒，
+        # 還在佇列中沒寫入的結果算成丟掉
+        if self.thread.is_alive():
+            try:
+                self.queue.put(None, timeout=timeout)
+            except queue.Full:
+                pass
+            else:
+                self.thread.join(timeout)
+        if self.thread.is_alive():
+            LOG.warning("Run store %s did not finish writing within %gs", self.path, timeout)
+        while True:
+            try:
+                run = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if run is not None:
+                self.dropped += 1
+        if self.dropped:
+            LOG.warning("Run store dropped %d runs, wrote %d to %s", self.dropped, self.written, self.path)
+
+    def _run(self):
+        db = connect(self.path)
+        stopping = False
+        while not stopping:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                stopping = True
+                batch = [run for run in batch if run is not None]
+            with db:
+                db.executemany(INSERT, batch)
+            self.written += len(batch)
+        db.close()
+
+
+def where(source=None, ai=None):
+    conditions = []
+    params = []
+    if source is not None:
+        conditions.append('source = ?')
+        params.append(source)
+    if ai is not None:
+        conditions.append('ai = ?')
+        params.append(ai)
+    return (' WHERE ' + ' AND '.join(conditions) if conditions else ''), params
+
+
+def high_scores(db, limit=10, source=None, ai=None):
+    # 距離最遠的幾局：(距離, 種子, 最高速度, 地形, 來源, AI 模式, 死因, 時間)
+    clause, params = where(source, ai)
+    return db.execute(
+        'SELECT distance, seed, max_speed, terrain, source, ai, killed_by, time FROM runs'
+        f'{clause} ORDER BY distance DESC LIMIT ?', params + [limit]).fetchall()
+
+
+def summary(db, source=None):
+    # 每個來源和 AI 模式的 (來源, AI 模式, 局數, 平均距離, 最遠距離)
+    clause, params = where(source)
+    return db.execute(
+        f'SELECT source, ai, COUNT(*), AVG(distance), MAX(distance) FROM runs{clause} '
+        'GROUP BY source, ai ORDER BY source, ai', params).fetchall()
+
+
+def deaths(db):
+    # 每種障礙物在每個地形撞死幾局：(障礙物, 地形, 局數)，沒撞到的不算
+    return db.execute(
+        'SELECT killed_by, terrain, COUNT(*) FROM runs WHERE killed_by IS NOT NULL '
+        'GROUP BY killed_by, terrain ORDER BY COUNT(*) DESC').fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Dino Run run statistics')
+    parser.add_argument('--db', default=DEFAULT_PATH, help='資料庫路徑')
+    parser.add_argument('--top', type=int, default=10, help='顯示幾局最高分')
+    parser.add_argument('--source', help='只看這個來源（game、tune、search）')
+    parser.add_argument('--ai', choices=('player', 'ai', 'mixed', 'search'), help='只看這個 AI 模式')
+    args = parser.parse_args()
+
+    db = connect(args.db)
+    print(f"{'distance':>9} {'seed':>10} {'speed':>5} {'terrain':<8} {'source':<6} {'ai':<6} "
+          f"{'killed by':<9} time")
+    for distance, seed, speed, terrain, source, ai, killed_by, when in high_scores(
+            db, args.top, args.source, args.ai):
+        print(f"{distance:>8.0f}m {seed:>10} {speed:>5.1f} {terrain:<8} {source:<6} {ai:<6} "
+              f"{killed_by or '-':<9} {time.strftime('%Y-%m-%d %H:%M', time.localtime(when))}")
+    print()
+    for source, ai, count, mean, best in summary(db, args.source):
+        print(f"{source:<6} {ai:<6} {count:>10} runs  mean {mean:>7.0f}m  best {best:>7.0f}m")
+    if args.source is None:
+        print()
+        for killed_by, terrain, count in deaths(db):
+            print(f"{killed_by:<6} in {terrain:<8} {count:>10} deaths")
+    db.close()
+
+
+if __name__ == '__main__':
+    main()
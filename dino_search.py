@@ -0,0 +1,214 @@
+import argparse
+import heapq
+import statistics
+import time
+
+import pygame
+
+import dino_game
+import dino_runs
+
+
+class PlanSearch:
+    # 從一個快照往後搜尋：每個節點是恐龍在地面上的某個 tick，分支為「跑一個 tick」
+    # 或「起跳直到落地」。同一個 tick 的世界狀態和跳法無關，只保留起跳次數最少的路徑，
+    # 所以同時最多約 40 個 tick。用像素判斷碰撞時，跑步動畫的位置決定比對哪一張圖片的遮罩，
+    # 所以同一個 tick 依動畫位置分開保留；起跳的結果和動畫位置無關（空中用跳躍圖片，
+    # 落地時動畫歸零），每個 tick 只模擬一次起跳。找到能撐到 horizon 的路徑後只採用前半段，
+    # 避免停在一個之後怎麼跳都會撞到的位置
+    def __init__(self, sim, root, horizon):
+        self.sim = sim
+        root_tick = root[0]
+        self.goal = root_tick + horizon
+        self.commit = root_tick + horizon // 2
+        start = (root_tick, root, ())
+        # tick -> 動畫位置 -> (快照, 起跳的 tick, 路徑上 commit 之前最後一個節點)
+        self.frontier = {root_tick: {self.frame(root): (root, (), start)}}
+        self.heap = [root_tick]
+        self.best = start   # 目前走得最遠的節點
+        self.result = None  # (tick, 快照, 起跳的 tick)
+
+    def frame(self, snapshot):
+        # 不用像素判斷碰撞時動畫位置不影響結果，同一個 tick 只保留一個節點
+        return snapshot[2][6] if self.sim.pixel_collisions else 0
+
+    def run(self, deadline):
+        # 搜尋到 deadline 為止，結束時回傳 True；所有路徑都會撞到時使用走得最遠的路徑
+        sim = self.sim
+        while self.heap:
+            if time.perf_counter() >= deadline:
+                return False
+            tick = heapq.heappop(self.heap)
+            nodes = list(self.frontier.pop(tick).values())
+            branches = [node + (False,) for node in nodes]
+            branches.append(min(nodes, key=lambda node: len(node[1])) + (True,))
+            for snapshot, jumps, anchor, jump in branches:
+                sim.restore(snapshot)
+                sim.step(jump)
+                while sim.dino.is_jumping and not sim.game_over:
+                    sim.step()
+                if sim.game_over:
+                    continue
+                end = sim.ticks
+                path = jumps + (tick,) if jump else jumps
+                node = sim.snapshot()
+                if end > self.best[0]:
+                    self.best = (end, node, path)
+                if end >= self.goal:
+                    self.result = anchor
+                    return True
+                frames = self.frontier.get(end)
+                if frames is None:
+                    frames = self.frontier[end] = {}
+                    heapq.heappush(self.heap, end)
+                frame = self.frame(node)
+                known = frames.get(frame)
+                if known is None or len(path) < len(known[1]):
+                    child = (end, node, path) if end <= self.commit else anchor
+                    frames[frame] = (node, path, child)
+        self.result = self.best
+        return True
+
+
+class SearchAgent:
+    # DinoAI 的替代方案：用 GameState 的快照向前模擬，找出未來 horizon 個 tick 都不會撞到的
+    # 起跳時機。計畫會一段一段延伸，每個 tick 搜尋約 budget_ms 毫秒
+    # （展開完一個節點才檢查時間，可能超過一個跳躍的模擬時間，約 0.1 毫秒到數毫秒）
+    def __init__(self, horizon=300, budget_ms=4.0):
+        self.horizon = horizon
+        self.budget = budget_ms / 1000
+        self.sim = None
+        self.jumps = set()       # 計畫中要起跳的 tick
+        self.plan_end = None     # 計畫結束時的快照，下一段搜尋從這裡開始
+        self.checkpoints = {}    # tick -> 預期的恐龍狀態，用來確認遊戲照著計畫進行
+        self.search = None
+        self.last_tick = None
+
+    def start(self, state):
+        # 從目前的狀態重新規劃（第一次、新的一局，或遊戲和計畫不一致時）
+        if self.sim is None:
+            self.sim = dino_game.GameState(scenery=False)
+        sim = self.sim
+        sim.pixel_collisions = state.pixel_collisions
+        sim.obstacle_manager.base_gap = state.obstacle_manager.base_gap
+        sim.spawn_chance = state.spawn_chance
+        self.plan_end = state.snapshot()
+        self.jumps.clear()
+        self.checkpoints = {state.ticks: self.plan_end[2]}
+        self.search = None
+
+    def on_plan(self, state):
+        tick = state.ticks
+        if self.last_tick is None or tick < self.last_tick:
+            return False
+        expected = self.checkpoints.pop(tick, None)
+        if expected is not None and expected != state.snapshot()[2]:
+            return False
+        return not (tick in self.jumps and state.dino.is_jumping)
+
+    def act(self, state):
+        # 回傳這個 tick 是否要跳
+        deadline = time.perf_counter() + self.budget
+        tick = state.ticks
+        if not self.on_plan(state):
+            self.start(state)
+        self.last_tick = tick
+
+        if self.search is None and self.plan_end[0] - tick < self.horizon:
+            self.search = PlanSearch(self.sim, self.plan_end, self.horizon)
+        if self.search is not None:
+            if not self.search.run(deadline) and self.plan_end[0] <= tick:
+                # 計畫已經用完但搜尋還沒結束：先使用目前走得最遠的路徑
+                self.search.result = self.search.best
+            if self.search.result is not None:
+                end, node, path = self.search.result
+                self.search = None
+                if end > self.plan_end[0]:
+                    self.jumps.update(path)
+                    self.plan_end = node
+                    self.checkpoints[end] = node[2]
+                elif end <= tick:
+                    # 沒有任何進展（所有路徑立刻撞到），下一個 tick 從目前狀態重新規劃
+                    self.last_tick = None
+
+        jump = tick in self.jumps
+        self.jumps.discard(tick)
+        return jump
+
+
+def new_state(seed, base_gap, spawn_chance, scenery=True):
+    state = dino_game.GameState(seed, scenery)
+    state.obstacle_manager.base_gap = base_gap
+    state.spawn_chance = spawn_chance
+    return state
+
+
+def play_headless(agent, state, max_ticks):
+    # 回傳每個 tick 搜尋花的時間（秒）
+    times = []
+    while state.ticks < max_ticks and not state.game_over:
+        start = time.perf_counter()
+        jump = agent.act(state)
+        times.append(time.perf_counter() - start)
+        state.step(jump)
+    return times
+
+
+def play_window(agent, state, max_ticks, fps=60):
+    dino_game.init_display()
+    window = pygame.display.set_mode((dino_game.WINDOW_WIDTH, dino_game.WINDOW_HEIGHT))
+    pygame.display.set_caption("Dino Game - Search agent")
+    renderer = dino_game.GameRenderer(window)
+    clock = pygame.time.Clock()
+    while state.ticks < max_ticks and not state.game_over:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and
+                                             event.key == pygame.K_ESCAPE):
+                return
+        state.step(agent.act(state))
+        renderer.draw(state)
+        renderer.present()
+        clock.tick(fps)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Dino Run look-ahead search agent')
+    parser.add_argument('--games', type=int, default=10, help='無頭模式跑幾局（種子 0 開始）')
+    parser.add_argument('--seed', type=int, default=0, help='第一局的種子')
+    parser.add_argument('--max-ticks', type=int, default=30000, help='每局最多幾個 tick')
+    parser.add_argument('--horizon', type=int, default=300, help='每段計畫向前搜尋幾個 tick')
+    parser.add_argument('--budget-ms', type=float, default=4.0, help='每個 tick 最多搜尋幾毫秒')
+    parser.add_argument('--base-gap', type=int, default=400, help='障礙物基本間距')
+    parser.add_argument('--spawn-chance', type=float, default=dino_game.OBSTACLE_SPAWN_CHANCE)
+    parser.add_argument('--render', action='store_true', help='在視窗中播放一局')
+    parser.add_argument('--runs-db', metavar='PATH', default=dino_runs.DEFAULT_PATH,
+                        help='無頭模式每一局結果的資料庫，用 dino_runs.py 查詢')
+    parser.add_argument('--no-runs', action='store_true', help='不記錄每一局的結果')
+    args = parser.parse_args()
+
+    agent = SearchAgent(args.horizon, args.budget_ms)
+    if args.render:
+        state = new_state(args.seed, args.base_gap, args.spawn_chance)
+        play_window(agent, state, args.max_ticks)
+        pygame.quit()
+        print(f"Seed {args.seed}: {int(state.dino.distance)}m")
+        return
+
+    times = []
+    runs = None if args.no_runs else dino_runs.RunStore(args.runs_db)
+    for seed in range(args.seed, args.seed + args.games):
+        state = new_state(seed, args.base_gap, args.spawn_chance, scenery=False)
+        times += play_headless(agent, state, args.max_ticks)
+        if runs:
+            runs.record(dino_runs.run_record(state, 'search', 'search'))
+        result = 'crashed' if state.game_over else 'survived'
+        print(f"Seed {seed}: {int(state.dino.distance)}m ({result} after {state.ticks} ticks)")
+    if runs:
+        runs.close()
+    times.sort()
+    print(f"Search time per tick: mean {statistics.fmean(times) * 1000:.3f}ms, "
+          f"p99 {times[int(len(times) * 0.99)] * 1000:.3f}ms, max {times[-1] * 1000:.3f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import time
+
+import dino_game
+import dino_runs
+
+# 可以調整的 AI 參數：名稱 -> (最小值, 最大值, 是否為整數)
+PARAMETERS = {
+    'lookahead': (1, 5, True),
+    'margin': (0.0, 20.0, False),
+    'landing_margin': (0.0, 60.0, False),
+}
+
+DEFAULT_PARAMS = {'lookahead': 3, 'margin': 0.0, 'landing_margin': 0.0}
+
+# 每個工作行程目前使用的參數，相同時不用重建起跳距離表
+_configured = None
+
+
+def play(task):
+    # 在工作行程中跑一局無頭遊戲，回傳距離和給 dino_runs 的結果
+    global _configured
+    params, seed, settings = task
+    if params != _configured:
+        dino_game.DinoAI.configure(**params)
+        _configured = params
+    state = dino_game.GameState(seed, scenery=False)
+    state.dino_ai.enabled = True
+    state.obstacle_manager.base_gap = settings['base_gap']
+    state.spawn_chance = settings['spawn_chance']
+    step = state.step
+    max_ticks = settings['max_ticks']
+    while state.ticks < max_ticks and not step():
+        pass
+    return int(state.dino.distance), dino_runs.run_record(state, 'tune', 'ai')
+
+
+def clip(name, value):
+    low, high, integer = PARAMETERS[name]
+    value = min(max(value, low), high)
+    # 四捨五入，讓同樣的參數組合在結果檔中有同樣的鍵
+    return int(round(value)) if integer else round(value, 2)
+
+
+def random_candidate(rng):
+    return {name: clip(name, rng.uniform(low, high)) for name, (low, high, _) in PARAMETERS.items()}
+
+
+def mutate(rng, parent, sigma):
+    # 高斯突變：sigma 是參數範圍的比例
+    return {name: clip(name, parent[name] + rng.gauss(0, (high - low) * sigma))
+            for name, (low, high, _) in PARAMETERS.items()}
+
+
+def propose(rng, strategy, store, population, generation):
+    # 第一代包含預設值；random 每代都隨機取樣，evolve 從目前最好的幾組突變
+    candidates = [dict(DEFAULT_PARAMS)] if generation == 0 else []
+    ranked = ranking(store)
+    parents = [record['params'] for record in ranked[:max(population // 4, 1)]]
+    sigma = 0.3 * 0.8 ** generation  # 每代縮小搜尋範圍
+    while len(candidates) < population:
+        if strategy == 'evolve' and parents:
+            candidates.append(mutate(rng, rng.choice(parents), sigma))
+        else:
+            candidates.append(random_candidate(rng))
+    return candidates
+
+
+def key(params):
+    return json.dumps(params, sort_keys=True)
+
+
+def load_store(path, settings):
+    # 只讀取設定相同的結果，中斷後重新執行會跳過已經評估的參數
+    store = {}
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record['settings'] == settings:
+                    store[key(record['params'])] = record
+    return store
+
+
+def save_record(path, record):
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record) + '\n')
+
+
+def stats(distances):
+    ordered = sorted(distances)
+    return {
+        'runs': len(ordered),
+        'mean': statistics.fmean(ordered),
+        'min': ordered[0],
+        'p10': ordered[int(len(ordered) * 0.1)],
+        'median': statistics.median(ordered),
+        'max': ordered[-1],
+    }
+
+
+def ranking(store):
+    # 完整跑完所有種子的參數組合，依平均距離排序
+    complete = [record for record in store.values() if not record['pruned']]
+    return sorted(complete, key=lambda record: stats(record['distances'])['mean'], reverse=True)
+
+
+def evaluate(pool, candidates, settings, store, path, prune, runs=None):
+    # 分兩階段：先用四分之一的種子跑，明顯比目前最好的差的參數就不再繼續
+    seeds = settings['seeds']
+    split = max(len(seeds) // 4, 1)
+    stages = (seeds[:split], seeds[split:])
+    results = {key(params): [] for params in candidates}
+    alive = list(candidates)
+    for stage, stage_seeds in enumerate(stages):
+        tasks = [(params, seed, settings) for params in alive for seed in stage_seeds]
+        outcomes = pool.map(play, tasks, chunksize=max(len(stage_seeds) // 4, 1))
+        distances = [distance for distance, _ in outcomes]
+        if runs:
+            for _, run in outcomes:
+                runs.record(run)
+        for i, params in enumerate(alive):
+            results[key(params)] += distances[i * len(stage_seeds):(i + 1) * len(stage_seeds)]
+        if stage == 0 and stages[1]:
+            ranked = ranking(store)
+            best = stats(ranked[0]['distances'])['mean'] if ranked else 0
+            survivors = []
+            for params in alive:
+                if statistics.fmean(results[key(params)]) < best * prune:
+                    record = {'params': params, 'settings': settings,
+                              'distances': results[key(params)], 'pruned': True}
+                    store[key(params)] = record
+                    save_record(path, record)
+                else:
+                    survivors.append(params)
+            alive = survivors
+    for params in alive:
+        record = {'params': params, 'settings': settings,
+                  'distances': results[key(params)], 'pruned': False}
+        store[key(params)] = record
+        save_record(path, record)
+
+
+def print_report(store, top):
+    ranked = ranking(store)
+    pruned = sum(record['pruned'] for record in store.values())
+    print(f"{len(store)} parameter sets evaluated, {pruned} pruned early")
+    print(f"{'lookahead':>9} {'margin':>7} {'landing':>7}   {'mean':>7} {'min':>6} "
+          f"{'p10':>6} {'median':>7} {'max':>6}")
+    for record in ranked[:top]:
+        params = record['params']
+        s = stats(record['distances'])
+        print(f"{params['lookahead']:>9} {params['margin']:>7.2f} {params['landing_margin']:>7.2f}   "
+              f"{s['mean']:>7.0f} {s['min']:>6} {s['p10']:>6} {s['median']:>7.0f} {s['max']:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Dino Run AI parameter tuner')
+    parser.add_argument('--strategy', choices=('random', 'evolve'), default='evolve',
+                        help='random：隨機搜尋；evolve：從最好的參數突變（預設）')
+    parser.add_argument('--generations', type=int, default=5)
+    parser.add_argument('--population', type=int, default=16, help='每一代評估幾組參數')
+    parser.add_argument('--runs', type=int, default=64, help='每組參數跑幾局（不同的種子）')
+    parser.add_argument('--max-ticks', type=int, default=30000, help='每局最多幾個 tick')
+    parser.add_argument('--base-gap', type=int, default=150, help='障礙物基本間距，越小越難')
+    parser.add_argument('--spawn-chance', type=float, default=0.5, help='每個 tick 生成障礙物的機率')
+    parser.add_argument('--prune', type=float, default=0.8,
+                        help='第一階段平均距離低於目前最好的這個比例時提早淘汰')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='工作行程數，預設全部核心')
+    parser.add_argument('--seed', type=int, default=0, help='搜尋用的亂數種子')
+    parser.add_argument('--results', default='tune_results.jsonl', help='結果檔，重新執行時會接續')
+    parser.add_argument('--top', type=int, default=10, help='報告中顯示幾組最好的參數')
+    parser.add_argument('--runs-db', metavar='PATH', default=dino_runs.DEFAULT_PATH,
+                        help='每一局結果的資料庫，用 dino_runs.py 查詢')
+    parser.add_argument('--no-runs', action='store_true', help='不記錄每一局的結果')
+    args = parser.parse_args()
+
+    settings = {
+        'seeds': list(range(args.runs)),
+        'max_ticks': args.max_ticks,
+        'base_gap': args.base_gap,
+        'spawn_chance': args.spawn_chance,
+    }
+    store = load_store(args.results, settings)
+    if store:
+        print(f"Resuming with {len(store)} results from {args.results}")
+    rng = random.Random(args.seed)
+
+    start = time.perf_counter()
+    games = 0
+    # 用 close/join 結束工作行程：pygame 會攔截 SIGTERM，Pool.terminate() 可能一直等下去
+    pool = multiprocessing.Pool(args.workers)
+    runs = None if args.no_runs else dino_runs.RunStore(args.runs_db)
+    try:
+        for generation in range(args.generations):
+            # 已經評估過的參數（包括之前中斷的執行）直接跳過
+            candidates = propose(rng, args.strategy, store, args.population, generation)
+            pending = []
+            for params in candidates:
+                if key(params) not in store and params not in pending:
+                    pending.append(params)
+            before = sum(len(record['distances']) for record in store.values())
+            evaluate(pool, pending, settings, store, args.results, args.prune, runs)
+            games += sum(len(record['distances']) for record in store.values()) - before
+            ranked = ranking(store)
+            best = stats(ranked[0]['distances'])['mean'] if ranked else 0
+            print(f"Generation {generation + 1}/{args.generations}: {len(pending)} new sets, "
+                  f"best mean {best:.0f}m")
+    finally:
+        pool.close()
+        pool.join()
+        if runs:
+            runs.close()
+    elapsed = time.perf_counter() - start
+    if games:
+        print(f"{games} games in {elapsed:.1f}s ({games / elapsed:.1f} games/s, {args.workers} workers)")
+    print_report(store, args.top)
+
+
+if __name__ == '__main__':
+    main()